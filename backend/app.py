@@ -6,6 +6,7 @@ from flask import Flask, render_template
 from flask_cors import CORS
 
 from .utils.db import ensure_indexes
+from .seeds.run_backfills import start_pending_thread
 from .routes.tasks import bp as tasks_bp
 from .routes.sessions import bp as sessions_bp
 from .routes.moods import bp as moods_bp
@@ -71,6 +72,10 @@ def create_app() -> Flask:
         print("  The app will continue but database features may not work.")
         print(f"  Make sure MONGODB_URI is set correctly in your environment variables.")
 
+    # Fill rollups, tiles and search terms that data from older versions
+    # lacks (once per database, in the background)
+    start_pending_thread()
+
     # Blueprints
     app.register_blueprint(tasks_bp)
     app.register_blueprint(sessions_bp)
@@ -115,6 +120,12 @@ def create_app() -> Flask:
 
         return list_tasks()
 
+    @app.route("/api/tasks/search", methods=["GET"])
+    def api_search_tasks():
+        from .routes.tasks import search_tasks
+
+        return search_tasks()
+
     @app.route("/api/tasks", methods=["POST"])
     def api_create_task():
         from .routes.tasks import create_task
@@ -127,6 +138,12 @@ def create_app() -> Flask:
 
         return update_task(task_id)
 
+    @app.route("/api/tasks/<task_id>", methods=["PATCH"])
+    def api_patch_task(task_id: str):
+        from .routes.tasks import patch_task
+
+        return patch_task(task_id)
+
     @app.route("/api/tasks/<task_id>", methods=["DELETE"])
     def api_delete_task(task_id: str):
         from .routes.tasks import delete_task
@@ -139,6 +156,12 @@ def create_app() -> Flask:
 
         return complete_task(task_id)
 
+    @app.route("/api/tasks/batch", methods=["POST"])
+    def api_batch_tasks():
+        from .routes.tasks import batch_tasks
+
+        return batch_tasks()
+
     @app.route("/api/galaxy", methods=["GET"])
     def api_galaxy():
         from .routes.galaxy import galaxy_data
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from flask import Blueprint, jsonify, request
 from bson import ObjectId
 
 from ..utils.db import get_db, get_default_user_id
+from ..utils.fields import FieldSet
+from ..utils.recurrence import expand, month_window, parse_day, parse_window, series_rule
 
 
 bp = Blueprint("calendar", __name__, url_prefix="/calendar")
@@ -20,42 +22,117 @@ def serialize_event(doc: Dict[str, Any]) -> Dict[str, Any]:
         "time": doc.get("time"),
         "category": doc.get("category", "Personal"),
         "created_at": doc.get("created_at"),
+        "recurrence": doc.get("recurrence"),
     }
 
 
+EVENT_FIELDS = FieldSet({
+    "id": ["_id"],
+    "title": ["title"],
+    "date": ["date"],
+    "time": ["time"],
+    "category": ["category"],
+    "created_at": ["created_at"],
+    "recurrence": ["recurrence"],
+})
+
+
+# dates are stored as YYYY-MM-DD strings and times as HH:MM
+EVENT_SORT = [("date", 1), ("time", 1)]
+
+
 @bp.get("")
 def list_events():
     """
     GET /calendar
-    Optional query params: month, year (numbers)
+    Optional query params: month, year (numbers), or from, to
+    (YYYY-MM-DD); fields
+
+    With a month or from/to window, recurring events are expanded to one
+    entry per occurrence in it (same id, `occurrence` set to its date).
+    Without one, every event is listed once.
     """
     db = get_db()
     user_id = get_default_user_id()
 
-    query: Dict[str, Any] = {"user_id": user_id}
+    try:
+        fields = EVENT_FIELDS.requested()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     month = request.args.get("month")
     year = request.args.get("year")
-    if month and year:
-        # dates are stored as YYYY-MM-DD strings
-        month = str(month).zfill(2)
-        year = str(year)
-        query["date"] = {"$regex": f"^{year}-{month}-"}
+    try:
+        if month and year:
+            window = month_window(int(year), int(month))
+        else:
+            window = parse_window(request.args.get("from"), request.args.get("to"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    query: Dict[str, Any] = {"user_id": user_id}
+    serialize = EVENT_FIELDS.serializer(serialize_event, fields)
+    if window is None:
+        docs = db.calendar_events.find(query, EVENT_FIELDS.projection(fields)).sort(EVENT_SORT)
+        return jsonify([serialize(d) for d in docs])
+    return jsonify(events_in_window(db, query, window, fields))
+
 
-    docs = db.calendar_events.find(query).sort([("date", 1), ("time", 1)])
-    return jsonify([serialize_event(d) for d in docs])
+def events_in_window(db, query: Dict[str, Any], window, fields: List[str] | None) -> List[Dict[str, Any]]:
+    """
+    Events matching `query` inside `window`, in date/time order, with
+    each recurring event expanded to its occurrences in the window only.
+    """
+    start, end = (d.isoformat() for d in window)
+    projection = EVENT_FIELDS.projection(fields, also=["date", "time", "recurrence"])
+    serialize = EVENT_FIELDS.serializer(serialize_event, fields)
+
+    single = {**query, "recurrence": {"$exists": False}, "date": {"$gte": start, "$lte": end}}
+    rows = [
+        ((doc.get("date"), doc.get("time") or ""), serialize(doc))
+        for doc in db.calendar_events.find(single, projection).sort(EVENT_SORT)
+    ]
+
+    series = {
+        **query,
+        "recurrence": {"$exists": True},
+        "date": {"$lte": end},
+        "recurrence.until": {"$not": {"$lt": start}},
+    }
+    for doc in db.calendar_events.find(series, projection):
+        try:
+            anchor = parse_day(doc.get("date"))
+        except ValueError:
+            continue
+        for day in expand(anchor, doc["recurrence"], *window):
+            item = serialize(doc)
+            if "date" in item:
+                item["date"] = day
+            item["occurrence"] = day
+            rows.append(((day, doc.get("time") or ""), item))
+
+    rows.sort(key=lambda row: row[0])
+    return [item for _, item in rows]
 
 
 @bp.post("")
 def create_event():
     """
     POST /calendar
-    Body: { title, date, time?, category? }
+    Body: { title, date, time?, category?, recurrence? }
+
+    `recurrence` repeats the event from `date`: { freq: daily|weekly|monthly,
+    interval?, byweekday?, until? | count?, exdates? }.
     """
     db = get_db()
     user_id = get_default_user_id()
     data = request.get_json(silent=True) or {}
 
+    try:
+        rule = series_rule(data.get("recurrence"), data.get("date"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
     doc = {
         "user_id": user_id,
         "title": data.get("title", "").strip(),
@@ -64,6 +141,8 @@ def create_event():
         "category": data.get("category", "Personal"),
         "created_at": datetime.utcnow(),
     }
+    if rule:
+        doc["recurrence"] = rule
     result = db.calendar_events.insert_one(doc)
     return (
         jsonify({"id": str(result.inserted_id), "message": "Event created successfully"}),
@@ -75,6 +154,8 @@ def create_event():
 def delete_event(event_id: str):
     """
     DELETE /calendar/<id>
+    Optional query param: occurrence (YYYY-MM-DD) to skip just that date
+    of a recurring event instead of deleting the series.
     """
     db = get_db()
     user_id = get_default_user_id()
@@ -84,6 +165,20 @@ def delete_event(event_id: str):
     except Exception:
         return jsonify({"error": "Invalid event id"}), 400
 
+    occurrence = request.args.get("occurrence")
+    if occurrence:
+        try:
+            day = parse_day(occurrence).isoformat()
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        result = db.calendar_events.update_one(
+            {"_id": oid, "user_id": user_id, "recurrence": {"$exists": True}},
+            {"$addToSet": {"recurrence.exdates": day}},
+        )
+        if not result.matched_count:
+            return jsonify({"error": "Recurring event not found"}), 404
+        return jsonify({"message": "Occurrence removed successfully"})
+
     db.calendar_events.delete_one({"_id": oid, "user_id": user_id})
     return jsonify({"message": "Event deleted successfully"})
 
@@ -1,11 +1,55 @@
 from __future__ import annotations
 
+import random
 from datetime import datetime
 
 from flask import Blueprint, jsonify, request
 from bson import ObjectId
 
+from ..utils.assignment import min_movement_assignment
 from ..utils.db import get_db, get_default_user_id
+from ..utils.fields import FieldSet
+from ..utils.galaxy_sync import (
+    get_revision_state,
+    mark_reset,
+    next_revision,
+    parse_cursor,
+    record_tombstones,
+    settled_revision,
+    tombstone_floor,
+)
+from ..utils.history import record_layout_op, undo_layout_op
+from ..utils.layout import (
+    commit_layout,
+    parse_positions,
+    serialize_changes,
+    write_positions,
+)
+from ..utils.reset_jobs import (
+    advance_reset_job,
+    serialize_reset_job,
+    start_reset_job,
+    start_reset_thread,
+    visible_filter,
+)
+from ..utils.rollups import clear_focus_day, clear_heatmap, day_key
+from ..utils.shape_index import ShapeIndex, shape_descriptor
+from ..utils.spatial import (
+    DETAIL_ZOOM,
+    bbox_query,
+    cluster_pipeline,
+    parse_bbox,
+    tile_fields,
+)
+from ..utils.star_logic import compute_spiral_positions
+from ..utils.stats_cache import bump_data_version
+from ..utils.streaks import clear_streak
+from ..utils.wire import (
+    LAYOUT_PROJECTION,
+    STYLE_PROJECTION,
+    columnar_response,
+    negotiate_format,
+)
 
 
 bp = Blueprint("galaxy", __name__)
@@ -25,15 +69,149 @@ def serialize_celestial(doc):
     }
 
 
+CELESTIAL_FIELDS = FieldSet({
+    "id": ["_id"],
+    "type": ["type"],
+    "radius": ["radius"],
+    "color": ["color"],
+    "x": ["x"],
+    "y": ["y"],
+    "created_at": ["created_at"],
+    "session_id": ["session_id"],
+    "meta": ["meta"],
+})
+
+
 @bp.get("/api/galaxy/data")
 def galaxy_data():
     """
     Primary endpoint for the canvas.
+
+    Without query params this returns the full list of objects. With
+    `?since=<cursor>` it returns a delta envelope:
+    { cursor, full, objects: [...], deleted: [id, ...] }
+    `since=0` (or a cursor older than the last reset) yields full=true and
+    every object; otherwise only objects created/moved after the cursor and
+    ids deleted after it are returned.
+
+    The full list honours content negotiation (`?format=columnar|binary` or
+    the matching Accept type, see utils/wire.py) for parallel-array payloads.
+
+    With `?bbox=minx,miny,maxx,maxy&zoom=<z>` only objects inside the
+    viewport are returned; below DETAIL_ZOOM dense cells come back as
+    clusters: { objects: [...], clusters: [{x, y, count, radius, color}] }
+
+    JSON object lists honour `?fields=id,x,y,...` (see CELESTIAL_FIELDS).
     """
     db = get_db()
     user_id = get_default_user_id()
-    docs = db.celestial_objects.find({"user_id": user_id}).sort("created_at", 1)
-    return jsonify([serialize_celestial(d) for d in docs])
+
+    try:
+        fields = CELESTIAL_FIELDS.requested()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if request.args.get("bbox") is not None:
+        return _galaxy_viewport(db, user_id, fields)
+
+    since_raw = request.args.get("since")
+    if since_raw is None:
+        fmt = negotiate_format()
+        if fmt != "json":
+            docs = db.celestial_objects.find(
+                visible_filter(db, user_id), STYLE_PROJECTION
+            ).sort("created_at", 1)
+            response = columnar_response(fmt, docs)
+        else:
+            docs = db.celestial_objects.find(
+                visible_filter(db, user_id), CELESTIAL_FIELDS.projection(fields)
+            ).sort("created_at", 1)
+            serialize = CELESTIAL_FIELDS.serializer(serialize_celestial, fields)
+            response = jsonify([serialize(d) for d in docs])
+        response.vary.add("Accept")
+        return response
+
+    return _galaxy_delta(db, user_id, since_raw, fields)
+
+
+def _galaxy_delta(db, user_id: str, since_raw: str, fields=None):
+    since = parse_cursor(since_raw)
+    if since is None:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    # Read the counter before the objects. The cursor handed back stays
+    # behind revisions that may still be in flight, so the next delta
+    # re-reads them instead of skipping objects that land late.
+    state = get_revision_state(db, user_id)
+    cursor = settled_revision(state, since=since)
+    full = (
+        since == 0
+        or since < int(state.get("reset_rev", 0))
+        or since < tombstone_floor(state)
+        or since > int(state.get("rev", 0))
+    )
+
+    visible = visible_filter(db, user_id, state=state)
+    projection = CELESTIAL_FIELDS.projection(fields)
+    serialize = CELESTIAL_FIELDS.serializer(serialize_celestial, fields)
+    if full:
+        docs = db.celestial_objects.find(visible, projection).sort("created_at", 1)
+        deleted = []
+    else:
+        docs = db.celestial_objects.find(
+            {**visible, "rev": {"$gt": since}}, projection
+        ).sort("created_at", 1)
+        deleted = [
+            t["object_id"]
+            for t in db.galaxy_tombstones.find({"user_id": user_id, "rev": {"$gt": since}})
+        ]
+
+    return jsonify(
+        {
+            "cursor": str(cursor),
+            "full": full,
+            "objects": [serialize(d) for d in docs],
+            "deleted": deleted,
+        }
+    )
+
+
+def _galaxy_viewport(db, user_id: str, fields=None):
+    bbox = parse_bbox(request.args.get("bbox"))
+    if bbox is None:
+        return jsonify({"error": "bbox must be minx,miny,maxx,maxy"}), 400
+
+    try:
+        zoom = float(request.args.get("zoom", DETAIL_ZOOM))
+    except ValueError:
+        return jsonify({"error": "Invalid zoom"}), 400
+    if not zoom > 0:
+        return jsonify({"error": "Invalid zoom"}), 400
+
+    match = {**visible_filter(db, user_id), **bbox_query(user_id, bbox)}
+
+    serialize = CELESTIAL_FIELDS.serializer(serialize_celestial, fields)
+    if zoom >= DETAIL_ZOOM:
+        docs = db.celestial_objects.find(match, CELESTIAL_FIELDS.projection(fields)).sort("created_at", 1)
+        return jsonify({"objects": [serialize(d) for d in docs], "clusters": []})
+
+    objects = []
+    clusters = []
+    for cell in db.celestial_objects.aggregate(cluster_pipeline(match, zoom)):
+        if cell["count"] == 1:
+            objects.append(serialize(cell["sample"]))
+            continue
+        clusters.append(
+            {
+                "x": cell["x"],
+                "y": cell["y"],
+                "count": cell["count"],
+                "radius": cell["radius"],
+                "color": cell["sample"].get("color"),
+            }
+        )
+
+    return jsonify({"objects": objects, "clusters": clusters})
 
 
 @bp.get("/api/galaxy")
@@ -61,21 +239,26 @@ def create_stars():
         return jsonify({"created": 0, "ids": []})
 
     now = datetime.utcnow()
+    rev = next_revision(db, user_id)
     new_docs = []
     for s in stars:
+        x, y = float(s.get("x", 0)), float(s.get("y", 0))
         new_docs.append({
             "user_id": user_id,
-            "x": float(s.get("x", 0)),
-            "y": float(s.get("y", 0)),
+            "x": x,
+            "y": y,
+            **tile_fields(x, y),
             "radius": float(s.get("radius", 2)),
             "color": s.get("color", "#FFD700"),
             "type": s.get("type", "star"),
             "created_at": now,
-            "created_via": "constellation_merge"
+            "created_via": "constellation_merge",
+            "rev": rev,
         })
 
     if new_docs:
         result = db.celestial_objects.insert_many(new_docs)
+        bump_data_version(db, user_id)
         return jsonify({
             "created": len(result.inserted_ids),
             "ids": [str(oid) for oid in result.inserted_ids]
@@ -107,23 +290,47 @@ def delete_stars():
             
     if not oids:
         return jsonify({"deleted": 0})
-        
+
+    # Only tombstone ids that actually belong to this user.
+    owned = [
+        d["_id"]
+        for d in db.celestial_objects.find(
+            {"_id": {"$in": oids}, "user_id": user_id}, {"_id": 1}
+        )
+    ]
+    if not owned:
+        return jsonify({"deleted": 0})
+
     result = db.celestial_objects.delete_many({
-        "_id": {"$in": oids},
+        "_id": {"$in": owned},
         "user_id": user_id
     })
-    
+    record_tombstones(db, user_id, owned, next_revision(db, user_id))
+    bump_data_version(db, user_id)
+
     return jsonify({"deleted": result.deleted_count})
 @bp.post("/api/galaxy/reset")
 def galaxy_reset():
+    """
+    Reset the galaxy. The old stars, layout and sessions are hidden at once
+    and deleted in batches by a background job, which then drops the old
+    tombstones and past days' focus rollups; poll
+    /api/galaxy/reset/<job_id> for progress.
+    """
     db = get_db()
     user_id = get_default_user_id()
     if not user_id:
         return jsonify({"ok": False, "error": "unauthenticated"}), 401
 
-    deleted = db.celestial_objects.delete_many({"user_id": user_id}).deleted_count
-    db.galaxy_layout.delete_many({"user_id": user_id})
-    db.sessions.delete_many({"user_id": user_id})
+    job = start_reset_job(db, user_id)
+    mark_reset(db, user_id)
+    # Sessions after the reset count towards today again; earlier days
+    # are cleared by the job.
+    clear_focus_day(db, user_id, day_key(job["cutoff"]))
+    clear_heatmap(db, user_id)
+    clear_streak(db, user_id)
+    bump_data_version(db, user_id)
+    start_reset_thread(job["_id"])
 
     default_stats = {
         "user_id": user_id,
@@ -140,23 +347,63 @@ def galaxy_reset():
         upsert=True,
     )
 
-    return jsonify({"ok": True, "deleted": deleted, "stats": default_stats})
+    return jsonify({"ok": True, "job": serialize_reset_job(job), "stats": default_stats})
+
+
+@bp.get("/api/galaxy/reset/<job_id>")
+def galaxy_reset_status(job_id: str):
+    """
+    GET /api/galaxy/reset/<job_id>
+    Report reset progress. Each poll also runs one deletion batch, so the
+    job finishes even where background threads do not survive.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    try:
+        oid = ObjectId(job_id)
+    except Exception:
+        return jsonify({"error": "Invalid job id"}), 400
+
+    job = db.reset_jobs.find_one({"_id": oid, "user_id": user_id}, {"_id": 1})
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify(serialize_reset_job(advance_reset_job(db, oid)))
 
 
 @bp.get("/api/galaxy/layout")
 def galaxy_layout_get():
+    """
+    Star positions: { layout: [{id, x, y}, ...] }, or parallel id/x/y
+    arrays with `?format=columnar|binary`.
+    """
     db = get_db()
     user_id = get_default_user_id()
-    docs = db.celestial_objects.find({"user_id": user_id})
-    layout = [
-        {"id": str(doc["_id"]), "x": doc.get("x", 0), "y": doc.get("y", 0)}
-        for doc in docs
-    ]
-    return jsonify({"layout": layout})
+
+    fmt = negotiate_format()
+    docs = db.celestial_objects.find(visible_filter(db, user_id), LAYOUT_PROJECTION)
+    if fmt != "json":
+        response = columnar_response(fmt, docs, with_style=False)
+    else:
+        layout = [
+            {"id": str(doc["_id"]), "x": doc.get("x", 0), "y": doc.get("y", 0)}
+            for doc in docs
+        ]
+        response = jsonify({"layout": layout})
+    response.vary.add("Accept")
+    return response
 
 
 @bp.post("/api/galaxy/layout")
 def galaxy_layout_save():
+    """
+    Save star positions.
+    Body: { layout: [{id, x, y}, ...] }
+    Only stars whose coordinates changed are written; the response echoes
+    just those: { updated, layout: [{id, x, y}, ...], op_id }
+    `op_id` can be passed to /api/galaxy/undo/<op_id>.
+    """
     data = request.get_json(silent=True) or {}
     layout = data.get("layout") or []
     if not isinstance(layout, list):
@@ -165,35 +412,67 @@ def galaxy_layout_save():
     db = get_db()
     user_id = get_default_user_id()
 
-    updated = 0
-    for item in layout:
-        star_id = item.get("id")
-        if not star_id:
-            continue
-        try:
-            oid = ObjectId(star_id)
-        except Exception:
-            continue
-        update_result = db.celestial_objects.update_one(
-            {"_id": oid, "user_id": user_id},
-            {
-                "$set": {
-                    "x": float(item.get("x", 0) or 0),
-                    "y": float(item.get("y", 0) or 0),
-                }
-            },
-        )
-        updated += update_result.modified_count
-
     # Guard: Do not delete stars here. This endpoint only updates positions.
     # If the client sends a subset of stars, the others remain untouched.
-    
-    docs = db.celestial_objects.find({"user_id": user_id})
-    layout = [
-        {"id": str(doc["_id"]), "x": doc.get("x", 0), "y": doc.get("y", 0)}
-        for doc in docs
+    changes = commit_layout(db, user_id, parse_positions(layout))
+    op_id = record_layout_op(db, user_id, "layout_save", changes)
+
+    return jsonify({
+        "updated": len(changes),
+        "layout": serialize_changes(changes),
+        "op_id": op_id,
+    })
+
+
+@bp.post("/api/galaxy/relayout")
+def galaxy_relayout():
+    """
+    Re-spiral the whole galaxy in creation order.
+    Returns { updated, count, op_id } and resets the spiral counter so the next
+    session continues from the end of the spiral.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    docs = list(
+        db.celestial_objects.find(visible_filter(db, user_id), LAYOUT_PROJECTION).sort("created_at", 1)
+    )
+    xs, ys = compute_spiral_positions(1, len(docs), 0.0, 0.0)
+
+    changes = [
+        {"_id": d["_id"], "x": x, "y": y, "prev_x": d.get("x"), "prev_y": d.get("y")}
+        for d, x, y in zip(docs, xs, ys)
     ]
-    return jsonify({"updated": updated, "layout": layout})
+    write_positions(db, user_id, changes)
+    db.galaxy_revisions.update_one(
+        {"user_id": user_id}, {"$set": {"star_index": len(docs)}}, upsert=True
+    )
+    op_id = record_layout_op(db, user_id, "relayout", changes)
+
+    return jsonify({"updated": len(changes), "count": len(docs), "op_id": op_id})
+
+
+@bp.post("/api/galaxy/undo/<op_id>")
+def galaxy_undo(op_id: str):
+    """
+    POST /api/galaxy/undo/<op_id>
+    Revert a layout save/merge, constellation apply or relayout: only the
+    stars it touched are restored, in one bulk write.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    try:
+        oid = ObjectId(op_id)
+    except Exception:
+        return jsonify({"error": "Invalid op id"}), 400
+
+    result = undo_layout_op(db, user_id, oid)
+    if result is None:
+        return jsonify({"error": "Operation not found or already undone"}), 404
+    if result["deleted"]:
+        bump_data_version(db, user_id)
+    return jsonify(result)
 
 
 import json
@@ -209,6 +488,7 @@ def load_constellations():
         return {}
 
 CONSTELLATION_PRESETS = load_constellations()
+CONSTELLATION_INDEX = ShapeIndex(CONSTELLATION_PRESETS)
 
 
 @bp.get("/api/constellations")
@@ -216,6 +496,125 @@ def constellation_presets():
     return jsonify({"constellations": CONSTELLATION_PRESETS})
 
 
+@bp.get("/api/galaxy/constellation/suggest")
+def constellation_suggest():
+    """
+    GET /api/galaxy/constellation/suggest?k=3
+    Presets whose shape is closest to the user's current stars, ignoring
+    position, scale and rotation: { suggestions: [{name, score}, ...] }
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    try:
+        k = max(1, min(int(request.args.get("k", 3)), 20))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+
+    docs = db.celestial_objects.find(visible_filter(db, user_id), LAYOUT_PROJECTION)
+    points = [(float(d.get("x", 0) or 0), float(d.get("y", 0) or 0)) for d in docs]
+    if len(points) < 2:
+        return jsonify({"suggestions": []})
+
+    matches = CONSTELLATION_INDEX.nearest(shape_descriptor(points), k)
+    return jsonify(
+        {
+            "suggestions": [
+                {"name": name, "score": 1.0 / (1.0 + dist)} for name, dist in matches
+            ]
+        }
+    )
+
+
+@bp.post("/api/galaxy/constellation/apply")
+def constellation_apply():
+    """
+    Fit a preset constellation onto the user's galaxy in one request.
+    Body: { name, width, height, locked? }
+
+    Pattern points are scaled to the canvas (coordinates are relative to
+    its center, like every other star). Unless `locked`, existing stars are
+    matched to pattern points with a minimum total movement assignment;
+    points left over become new stars. Moves go out in one bulk write.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+    data = request.get_json(silent=True) or {}
+
+    name = data.get("name")
+    pattern = CONSTELLATION_PRESETS.get(name) if isinstance(name, str) else None
+    if not pattern:
+        return jsonify({"error": "Unknown constellation"}), 404
+
+    try:
+        width = float(data.get("width", 0))
+        height = float(data.get("height", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "width and height must be numbers"}), 400
+    if width <= 0 or height <= 0:
+        return jsonify({"error": "width and height must be positive"}), 400
+
+    targets = [
+        ((float(p["x"]) - 0.5) * width, (float(p["y"]) - 0.5) * height)
+        for p in pattern
+    ]
+
+    stars = []
+    if not data.get("locked"):
+        stars = list(db.celestial_objects.find(visible_filter(db, user_id), LAYOUT_PROJECTION))
+
+    positions = {}
+    leftover = targets
+    if stars:
+        sources = [(float(d.get("x", 0) or 0), float(d.get("y", 0) or 0)) for d in stars]
+        if len(sources) >= len(targets):
+            picks = min_movement_assignment(targets, sources)
+            positions = {stars[j]["_id"]: targets[i] for i, j in enumerate(picks)}
+            leftover = []
+        else:
+            # Fewer stars than points: every star moves, some points are new.
+            picks = min_movement_assignment(sources, targets)
+            positions = {stars[i]["_id"]: targets[j] for i, j in enumerate(picks)}
+            taken = set(picks)
+            leftover = [t for j, t in enumerate(targets) if j not in taken]
+
+    rev = next_revision(db, user_id)
+    changes = commit_layout(db, user_id, positions, rev=rev)
+
+    created_ids = []
+    if leftover:
+        now = datetime.utcnow()
+        docs = [
+            {
+                "user_id": user_id,
+                "x": x,
+                "y": y,
+                **tile_fields(x, y),
+                "radius": random.uniform(4.0, 7.0),
+                "color": "#FFD700",
+                "type": "star",
+                "created_at": now,
+                "created_via": "constellation_merge",
+                "rev": rev,
+            }
+            for x, y in leftover
+        ]
+        res = db.celestial_objects.insert_many(docs)
+        created_ids = [str(oid) for oid in res.inserted_ids]
+        bump_data_version(db, user_id)
+
+    op_id = record_layout_op(db, user_id, "constellation_apply", changes, created_ids)
+
+    return jsonify({
+        "name": name,
+        "updated": len(changes),
+        "layout": serialize_changes(changes),
+        "created": len(created_ids),
+        "created_ids": created_ids,
+        "op_id": op_id,
+    })
+
+
 @bp.post("/api/galaxy/layout/merge")
 def galaxy_layout_merge():
     """
@@ -232,46 +631,46 @@ def galaxy_layout_merge():
     updates = data.get("updates") or []
     new_stars = data.get("new_stars") or []
     
-    updated_count = 0
+    if not isinstance(updates, list) or not isinstance(new_stars, list):
+        return jsonify({"error": "updates and new_stars must be lists"}), 400
+
     created_ids = []
-    
-    # 1. Update existing stars
-    for item in updates:
-        star_id = item.get("id")
-        if not star_id: continue
-        try:
-            oid = ObjectId(star_id)
-            res = db.celestial_objects.update_one(
-                {"_id": oid, "user_id": user_id},
-                {"$set": {"x": float(item.get("x", 0)), "y": float(item.get("y", 0))}}
-            )
-            updated_count += res.modified_count
-        except:
-            continue
-            
+    rev = next_revision(db, user_id)
+
+    # 1. Update existing stars (moved ones only, one bulk write)
+    changes = commit_layout(db, user_id, parse_positions(updates), rev=rev)
+
     # 2. Create new stars
     if new_stars:
         now = datetime.utcnow()
         docs = []
         for s in new_stars:
+            x, y = float(s.get("x", 0)), float(s.get("y", 0))
             docs.append({
                 "user_id": user_id,
-                "x": float(s.get("x", 0)),
-                "y": float(s.get("y", 0)),
+                "x": x,
+                "y": y,
+                **tile_fields(x, y),
                 "radius": float(s.get("radius", 2)),
                 "color": s.get("color", "#FFD700"),
                 "type": s.get("type", "star"),
                 "created_at": now,
-                "created_via": "constellation_merge"
+                "created_via": "constellation_merge",
+                "rev": rev,
             })
         if docs:
             res = db.celestial_objects.insert_many(docs)
             created_ids = [str(oid) for oid in res.inserted_ids]
+            bump_data_version(db, user_id)
             
+    op_id = record_layout_op(db, user_id, "layout_merge", changes, created_ids)
+
     return jsonify({
-        "updated": updated_count,
+        "updated": len(changes),
+        "layout": serialize_changes(changes),
         "created": len(created_ids),
-        "created_ids": created_ids
+        "created_ids": created_ids,
+        "op_id": op_id,
     })
 
 
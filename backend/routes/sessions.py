@@ -7,7 +7,12 @@ from flask import Blueprint, jsonify, request
 from bson import ObjectId
 
 from ..utils.db import get_db, get_default_user_id
+from ..utils.fields import FieldSet
+from ..utils.reset_jobs import visible_filter
+from ..utils.rollups import hour_of_week, record_heatmap, record_session
+from ..utils.streaks import record_active_day, resolve_timezone
 from ..utils.star_logic import create_celestial_for_session
+from ..utils.stats_cache import bump_data_version
 
 
 bp = Blueprint("sessions", __name__, url_prefix="/sessions")
@@ -24,11 +29,22 @@ def serialize_session(doc: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+SESSION_FIELDS = FieldSet({
+    "id": ["_id"],
+    "task_id": ["task_id"],
+    "mood": ["mood"],
+    "duration_minutes": ["duration_minutes"],
+    "started_at": ["started_at"],
+    "ended_at": ["ended_at"],
+})
+
+
 @bp.post("")
 def create_session():
     """
     POST /sessions
-    Body: { task_id?, mood, duration_minutes }
+    Body: { task_id?, mood, duration_minutes, tz? }
+    `tz` (IANA zone name) sets the user's day boundary for streaks.
     Creates a focus session AND a celestial object.
     """
     db = get_db()
@@ -60,6 +76,12 @@ def create_session():
 
     result = db.sessions.insert_one(session_doc)
     session_id = str(result.inserted_id)
+    tz = resolve_timezone(data.get("tz"))
+    # Streaks first: a user's first streak state is seeded from the daily
+    # rollup, which must not already hold this session.
+    record_active_day(db, user_id, now, tz)
+    record_session(db, user_id, now, duration_minutes, mood)
+    record_heatmap(db, user_id, hour_of_week(now, tz), duration_minutes, mood)
 
     celestial = create_celestial_for_session(
         db=db,
@@ -68,6 +90,7 @@ def create_session():
         mood=mood,
         meta={"task_id": str(task_oid) if task_oid else None},
     )
+    bump_data_version(db, user_id)
 
     return (
         jsonify(
@@ -83,23 +106,26 @@ def create_session():
 @bp.get("/today")
 def sessions_today():
     """
-    GET /sessions/today
+    GET /sessions/today?fields=
     Returns all sessions for the current UTC day.
     """
     db = get_db()
     user_id = get_default_user_id()
 
+    try:
+        fields = SESSION_FIELDS.requested()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
     now = datetime.utcnow()
     start = datetime(now.year, now.month, now.day)
     end = datetime(now.year, now.month, now.day, 23, 59, 59, 999000)
 
-    docs = db.sessions.find(
-        {
-            "user_id": user_id,
-            "started_at": {"$gte": start, "$lte": end},
-        }
-    ).sort("started_at", 1)
+    query = visible_filter(db, user_id, field="started_at")
+    query["started_at"] = {**query.get("started_at", {}), "$gte": start, "$lte": end}
+    docs = db.sessions.find(query, SESSION_FIELDS.projection(fields)).sort("started_at", 1)
+    serialize = SESSION_FIELDS.serializer(serialize_session, fields)
 
-    return jsonify([serialize_session(d) for d in docs])
+    return jsonify([serialize(d) for d in docs])
 
 
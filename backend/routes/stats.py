@@ -1,16 +1,30 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-
-from flask import Blueprint, jsonify
-
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from flask import Blueprint, jsonify, request
+
+from ..utils.analytics import (
+    GRANULARITIES,
+    GROUP_BYS,
+    MAX_RANGE_DAYS,
+    bucket_minutes,
+    bucket_starts,
+    load_session_columns,
+)
 from ..utils.db import get_db, get_default_user_id
+from ..utils.reset_jobs import visible_filter
+from ..utils.rollups import dashboard_facets, day_key, mood_key, read_days, read_heatmap, summarize_days
+from ..utils.stats_cache import cached_stats
+from ..utils.streaks import read_streak, resolve_timezone
 
 
 bp = Blueprint("stats", __name__, url_prefix="/stats")
 
 
 @bp.get("/summary")
+@cached_stats
 def summary():
     """
     GET /stats/summary
@@ -20,52 +34,42 @@ def summary():
     user_id = get_default_user_id()
 
     total_tasks = db.tasks.count_documents({"user_id": user_id})
-    completed_tasks = db.tasks.count_documents({"user_id": user_id, "completed": True})
 
-    total_sessions = db.sessions.count_documents({"user_id": user_id})
-    total_minutes = 0
-    for s in db.sessions.find({"user_id": user_id}):
-        total_minutes += float(s.get("duration_minutes", 0) or 0)
+    # Everything else is summed server-side over the per-day rollup.
+    totals = summarize_days(db, user_id)
 
-    return jsonify(
-        {
-            "total_tasks": total_tasks,
-            "completed_tasks": completed_tasks,
-            "completion_rate": (completed_tasks / total_tasks) * 100 if total_tasks else 0,
-            "total_sessions": total_sessions,
-            "total_focus_minutes": total_minutes,
-        }
-    )
+    return jsonify(_summary_payload(total_tasks, totals))
+
+
+def _summary_payload(total_tasks: int, totals: Dict[str, Any]) -> Dict[str, Any]:
+    completed_tasks = totals["tasks_completed"]
+    return {
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "completion_rate": (completed_tasks / total_tasks) * 100 if total_tasks else 0,
+        "total_sessions": totals["sessions"],
+        "total_focus_minutes": totals["focus_minutes"],
+    }
 
 
 @bp.get("/streak")
+@cached_stats
 def streak():
     """
-    GET /stats/streak
-    Simple daily streak based on focus sessions.
+    GET /stats/streak?tz=<IANA zone>
+    Daily focus streak from the incrementally maintained streak state.
+    Days follow the given time zone (default: the one last seen for the
+    user, else UTC).
     """
     db = get_db()
     user_id = get_default_user_id()
 
-    # Get unique days with a session in the last 60 days
-    days = set()
-    since = datetime.utcnow() - timedelta(days=60)
-    for s in db.sessions.find({"user_id": user_id, "started_at": {"$gte": since}}):
-        dt = s.get("started_at")
-        if isinstance(dt, datetime):
-            days.add(dt.date())
-
-    today = datetime.utcnow().date()
-    streak_len = 0
-    current = today
-    while current in days:
-        streak_len += 1
-        current = current - timedelta(days=1)
-
-    return jsonify({"current_streak_days": streak_len})
+    tz = resolve_timezone(request.args.get("tz")) if request.args.get("tz") else None
+    return jsonify(read_streak(db, user_id, tz))
 
 
 @bp.get("/weekly")
+@cached_stats
 def weekly():
     """
     GET /stats/weekly
@@ -77,23 +81,131 @@ def weekly():
     today = datetime.utcnow().date()
     start = today - timedelta(days=6)
 
-    buckets = { (start + timedelta(days=i)): 0.0 for i in range(7) }
+    minutes = {
+        d["day"]: float(d.get("focus_minutes", 0) or 0)
+        for d in read_days(db, user_id, day_key(start), day_key(today), fields=["focus_minutes"])
+    }
+
+    return jsonify(_weekly_payload(start, minutes))
 
-    for s in db.sessions.find({"user_id": user_id}):
-        dt = s.get("started_at")
-        if isinstance(dt, datetime):
-            d = dt.date()
-            if start <= d <= today:
-                buckets[d] += float(s.get("duration_minutes", 0) or 0)
 
-    data = [
+def _weekly_payload(start, minutes: Dict[str, float]) -> List[Dict[str, Any]]:
+    return [
         {
-            "date": d.isoformat(),
-            "minutes": buckets[d],
+            "date": day_key(start + timedelta(days=i)),
+            "minutes": minutes.get(day_key(start + timedelta(days=i)), 0.0),
         }
-        for d in sorted(buckets.keys())
+        for i in range(7)
     ]
 
-    return jsonify(data)
+
+@bp.get("/range")
+@cached_stats
+def focus_range():
+    """
+    GET /stats/range?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month&group_by=mood|category
+    Focus minutes over an arbitrary (inclusive, UTC) range as dense series:
+    one value per bucket, zeros included. Defaults to the last 30 days by
+    day, ungrouped.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    granularity = request.args.get("granularity", "day")
+    group_by = request.args.get("group_by") or None
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+    if group_by is not None and group_by not in GROUP_BYS:
+        return jsonify({"error": f"group_by must be one of {', '.join(GROUP_BYS)}"}), 400
+
+    try:
+        end = date.fromisoformat(request.args["to"]) if request.args.get("to") else datetime.utcnow().date()
+        start = date.fromisoformat(request.args["from"]) if request.args.get("from") else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD"}), 400
+    if start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+    if (end - start).days >= MAX_RANGE_DAYS:
+        return jsonify({"error": f"range is limited to {MAX_RANGE_DAYS} days"}), 400
+
+    query = visible_filter(db, user_id, field="started_at")
+    query["started_at"] = {
+        **query.get("started_at", {}),
+        "$gte": datetime(start.year, start.month, start.day),
+        "$lt": datetime(end.year, end.month, end.day) + timedelta(days=1),
+    }
+    started_at, minutes, groups = load_session_columns(db, user_id, query, group_by)
+
+    starts = bucket_starts(start, end, granularity)
+    return jsonify(
+        {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "granularity": granularity,
+            "group_by": group_by,
+            "buckets": [d.isoformat() for d in starts],
+            "series": bucket_minutes(started_at, minutes, groups, starts),
+        }
+    )
+
+
+@bp.get("/heatmap")
+@cached_stats
+def heatmap():
+    """
+    GET /stats/heatmap?mood=<mood>
+    Focus minutes by weekday x hour (rows Monday..Sunday, 24 columns),
+    overall and per mood, from the incrementally maintained focus cube.
+    Hours are local to the time zone each session was recorded in.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    # Same key the session was recorded under.
+    mood = mood_key(request.args.get("mood")) if request.args.get("mood") else None
+    return jsonify(read_heatmap(db, user_id, mood))
+
+
+@bp.get("/dashboard")
+@cached_stats
+def dashboard():
+    """
+    GET /stats/dashboard?tz=<IANA zone>
+    Summary, streak, weekly minutes and galaxy counts in one response, so
+    the dashboard's first paint costs a single request. Each collection is
+    hit once (one $facet on the rollup, one $group on the galaxy). The
+    queries run one after another: the client holds a single connection
+    (maxPoolSize=1), so threads would only queue on it.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+    tz = resolve_timezone(request.args.get("tz")) if request.args.get("tz") else None
+
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=6)
+
+    rollup = dashboard_facets(db, user_id, day_key(start), day_key(today))
+    total_tasks = db.tasks.count_documents({"user_id": user_id})
+    minutes = {d["day"]: float(d.get("focus_minutes", 0) or 0) for d in rollup["week"]}
+
+    return jsonify(
+        {
+            "summary": _summary_payload(total_tasks, rollup["totals"]),
+            "streak": read_streak(db, user_id, tz),
+            "weekly": _weekly_payload(start, minutes),
+            "galaxy": _galaxy_counts(db, user_id),
+        }
+    )
 
 
+def _galaxy_counts(db, user_id: str) -> Dict[str, Any]:
+    by_type = {
+        row["_id"] or "unknown": row["count"]
+        for row in db.celestial_objects.aggregate(
+            [
+                {"$match": visible_filter(db, user_id)},
+                {"$group": {"_id": "$type", "count": {"$sum": 1}}},
+            ]
+        )
+    }
+    return {"total": sum(by_type.values()), "by_type": by_type}
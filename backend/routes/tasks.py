@@ -1,12 +1,33 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
 from flask import Blueprint, jsonify, request
 from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
 
 from ..utils.db import get_db, get_default_user_id
+from ..utils.fields import FieldSet
+from ..utils.pagination import decode_cursor, encode_cursor, keyset_filter, parse_limit
+from ..utils.recurrence import expand, parse_day, parse_rule, parse_window, series_rule
+from ..utils.rollups import (
+    completion_day,
+    day_key,
+    occurrence_completion_day,
+    record_task_completion,
+    task_completion_days,
+)
+from ..utils.search import (
+    MAX_SEARCH_CANDIDATES,
+    TERM_FIELDS,
+    query_terms,
+    score,
+    search_fields,
+    search_filter,
+    text_terms,
+)
+from ..utils.stats_cache import bump_data_version
 
 
 bp = Blueprint("tasks", __name__, url_prefix="/tasks")
@@ -23,6 +44,149 @@ def serialize_task(doc: Dict[str, Any]) -> Dict[str, Any]:
         "category": doc.get("category", "Personal"),
         "completed": bool(doc.get("completed", False)),
         "created_at": doc.get("created_at"),
+        "version": int(doc.get("version", 0)),
+        "recurrence": doc.get("recurrence"),
+    }
+
+
+TASK_FIELDS = FieldSet({
+    "id": ["_id"],
+    "title": ["title"],
+    "description": ["description"],
+    "date": ["date"],
+    "due_at": ["due_at"],
+    "priority": ["priority"],
+    "category": ["category"],
+    "completed": ["completed"],
+    "created_at": ["created_at"],
+    "version": ["version"],
+    "recurrence": ["recurrence"],
+})
+
+
+# Display order of task lists; _id breaks ties so keyset pages never skip
+# or repeat a task.
+TASK_SORT = [("date", -1), ("due_at", 1), ("created_at", -1), ("_id", -1)]
+
+# Projection for whole tasks: everything but the search index fields.
+FULL_TASK = {name: 0 for name in TERM_FIELDS}
+
+
+def new_task_doc(data: Dict[str, Any], user_id: str, now: datetime) -> Dict[str, Any]:
+    doc = {
+        "user_id": user_id,
+        "title": data.get("title", "").strip(),
+        "description": data.get("description", "").strip(),
+        "date": data.get("date"),
+        "due_at": data.get("due_at"),
+        "priority": data.get("priority", "Medium"),
+        "category": data.get("category", "Personal"),
+        "completed": bool(data.get("completed", False)),
+        "created_at": now,
+        "version": 1,
+    }
+    doc.update(search_fields(doc["title"], doc["description"]))
+    if doc["completed"]:
+        doc["completed_at"] = now
+    rule = series_rule(data.get("recurrence"), doc["date"])
+    if rule:
+        doc["recurrence"] = rule
+    return doc
+
+
+def task_update_ops(existing: Dict[str, Any], data: Dict[str, Any], now: datetime) -> Tuple[Dict[str, Any], int]:
+    """
+    Update document replacing a task's editable fields (missing ones keep
+    their value), and the change in completed count: 1, -1 or 0. Raises
+    ValueError on a bad recurrence rule.
+    """
+    update_doc = {
+        "title": data.get("title", existing.get("title", "")).strip(),
+        "description": data.get("description", existing.get("description", "")).strip(),
+        "date": data.get("date", existing.get("date")),
+        "due_at": data.get("due_at", existing.get("due_at")),
+        "priority": data.get("priority", existing.get("priority", "Medium")),
+        "category": data.get("category", existing.get("category", "Personal")),
+        "completed": bool(data.get("completed", existing.get("completed", False))),
+    }
+    update_doc.update(search_fields(update_doc["title"], update_doc["description"]))
+
+    update_ops: Dict[str, Any] = {"$set": update_doc, "$inc": {"version": 1}}
+    if "recurrence" in data:
+        rule = series_rule(data["recurrence"], update_doc["date"])
+        if rule:
+            update_doc["recurrence"] = rule
+        else:
+            update_ops["$unset"] = {"recurrence": ""}
+    was_completed = bool(existing.get("completed", False))
+    if update_doc["completed"] and not was_completed:
+        update_doc["completed_at"] = now
+        return update_ops, 1
+    if was_completed and not update_doc["completed"]:
+        update_ops.setdefault("$unset", {})["completed_at"] = ""
+        return update_ops, -1
+    return update_ops, 0
+
+
+def parse_occurrence(raw: str | None) -> str | None:
+    """
+    Occurrence date from `?occurrence=`, or None when absent. Raises
+    ValueError.
+    """
+    return parse_day(raw).isoformat() if raw else None
+
+
+def occurrence_completion_ops(occurrence: str, completed: bool, now: datetime) -> Dict[str, Any]:
+    """
+    Update marking one occurrence of a recurring task completed or not.
+    The series keeps the completed dates in `completed_dates` and, for
+    the rollups, when each was completed in `occurrence_completed_at`.
+    """
+    if completed:
+        return {
+            "$addToSet": {"completed_dates": occurrence},
+            "$set": {f"occurrence_completed_at.{occurrence}": now},
+            "$inc": {"version": 1},
+        }
+    return {
+        "$pull": {"completed_dates": occurrence},
+        "$unset": {f"occurrence_completed_at.{occurrence}": ""},
+        "$inc": {"version": 1},
+    }
+
+
+def completion_deltas(task: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Rollup changes for deleting a task: its completion and those of its
+    completed occurrences are un-counted.
+    """
+    deltas: Dict[str, int] = {}
+    for day in task_completion_days(task):
+        deltas[day] = deltas.get(day, 0) - 1
+    return deltas
+
+
+def completion_star_spec(task_id: str, task: Dict[str, Any], occurrence: str | None = None) -> Dict[str, Any]:
+    """
+    Star created when a task (or one occurrence of a recurring task) is
+    completed: a small, bright one (a fixed 15 minutes' worth, "happy"
+    colour) linked back to the task.
+    """
+    meta = {
+        "source": "task_completion",
+        "task_id": task_id,
+        "task_title": task.get("title", ""),
+        "task_category": task.get("category", "Personal"),
+    }
+    session_id = f"task-{task_id}"
+    if occurrence:
+        meta["occurrence"] = occurrence
+        session_id += f"-{occurrence}"
+    return {
+        "session_id": session_id,
+        "duration_minutes": 15.0,
+        "mood": "happy",
+        "meta": meta,
     }
 
 
@@ -30,7 +194,15 @@ def serialize_task(doc: Dict[str, Any]) -> Dict[str, Any]:
 def list_tasks():
     """
     GET /tasks
-    Optional query params: category, completed
+    Optional query params: category, completed, limit, cursor, fields,
+    from, to
+
+    Without `limit` every matching task is returned as a list. With it,
+    returns { tasks: [...], next_cursor } one page at a time; pass
+    next_cursor back as `cursor` for the following page (null when done).
+
+    With `from` and `to` (YYYY-MM-DD), returns the tasks dated in that
+    window, recurring ones expanded to one entry per occurrence.
     """
     try:
         db = get_db()
@@ -46,11 +218,39 @@ def list_tasks():
         if completed is not None:
             query["completed"] = completed == "true"
 
-        docs = (
-            db.tasks.find(query)
-            .sort([("date", -1), ("due_at", 1), ("created_at", -1)])
-        )
-        return jsonify([serialize_task(d) for d in docs])
+        try:
+            fields = TASK_FIELDS.requested()
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        try:
+            window = parse_window(request.args.get("from"), request.args.get("to"))
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        if window:
+            if request.args.get("limit") or request.args.get("cursor"):
+                return jsonify({"error": "from/to cannot be combined with limit/cursor"}), 400
+            return jsonify(tasks_in_window(db, query, window, fields))
+
+        try:
+            limit = parse_limit(request.args.get("limit"))
+            cursor = request.args.get("cursor")
+            if cursor:
+                query = {"$and": [query, keyset_filter(TASK_SORT, decode_cursor(cursor, TASK_SORT))]}
+        except ValueError:
+            return jsonify({"error": "Invalid limit or cursor"}), 400
+
+        # Cursors are built from the sort keys, so a page always fetches them.
+        projection = TASK_FIELDS.projection(fields, also=[f for f, _ in TASK_SORT] if limit else ())
+        serialize = TASK_FIELDS.serializer(serialize_task, fields)
+
+        docs = db.tasks.find(query, projection or FULL_TASK).sort(TASK_SORT)
+        if limit is None:
+            return jsonify([serialize(d) for d in docs])
+
+        page = list(docs.limit(limit + 1))
+        next_cursor = encode_cursor(page[limit - 1], TASK_SORT) if len(page) > limit else None
+        return jsonify({"tasks": [serialize(d) for d in page[:limit]], "next_cursor": next_cursor})
     except Exception as e:
         print(f"Error in list_tasks: {e}")
         import traceback
@@ -58,29 +258,143 @@ def list_tasks():
         return jsonify({"error": str(e), "message": "Failed to list tasks"}), 500
 
 
+def tasks_in_window(db, query: Dict[str, Any], window, fields: List[str] | None) -> List[Dict[str, Any]]:
+    """
+    Tasks matching `query` dated inside `window`, newest first. Recurring
+    tasks are stored once and expanded here to one entry per occurrence
+    in the window (same id, `occurrence` set to its date), so the cost
+    follows the window rather than the length of the series. An
+    occurrence is completed when its date is in the series'
+    `completed_dates` (or the whole series is completed).
+    """
+    start, end = (d.isoformat() for d in window)
+    projection = (
+        TASK_FIELDS.projection(fields, also=["date", "recurrence", "completed", "completed_dates"])
+        or FULL_TASK
+    )
+    serialize = TASK_FIELDS.serializer(serialize_task, fields)
+
+    single = {**query, "recurrence": {"$exists": False}, "date": {"$gte": start, "$lte": end}}
+    rows = [(doc.get("date"), serialize(doc)) for doc in db.tasks.find(single, projection).sort(TASK_SORT)]
+
+    # A series is completed per occurrence, so `completed` filters those.
+    wanted = query.get("completed")
+    series = {
+        **{k: v for k, v in query.items() if k != "completed"},
+        "recurrence": {"$exists": True},
+        "date": {"$lte": end},
+        "recurrence.until": {"$not": {"$lt": start}},
+    }
+    for doc in db.tasks.find(series, projection):
+        try:
+            anchor = parse_day(doc.get("date"))
+        except ValueError:
+            continue
+        done = set(doc.get("completed_dates") or ())
+        for day in expand(anchor, doc["recurrence"], *window):
+            completed = bool(doc.get("completed")) or day in done
+            if wanted is not None and completed != wanted:
+                continue
+            item = serialize(doc)
+            if "completed" in item:
+                item["completed"] = completed
+            if "date" in item:
+                item["date"] = day
+            if item.get("due_at") and str(item["due_at"])[:10] == anchor.isoformat():
+                item["due_at"] = day + str(item["due_at"])[10:]
+            item["occurrence"] = day
+            rows.append((day, item))
+
+    # Stable, so tasks sharing a date keep TASK_SORT order.
+    rows.sort(key=lambda row: row[0] or "", reverse=True)
+    return [item for _, item in rows]
+
+
+# Search pages are positions in the ranked list.
+SEARCH_CURSOR = [("offset", 1)]
+
+# Which matches make it into the ranked set when there are too many.
+SEARCH_CANDIDATE_SORT = [("created_at", -1), ("_id", -1)]
+
+
+@bp.get("/search")
+def search_tasks():
+    """
+    GET /tasks/search?q=<words>&limit=&cursor=&fields=
+    Tasks whose title or description has a word starting with each query
+    word, best matches first (title before description, whole words before
+    prefixes, then newest). Returns { tasks: [...], next_cursor, capped };
+    `capped` means there were more than MAX_SEARCH_CANDIDATES matches and
+    only the newest of them were ranked.
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+
+    terms = query_terms(request.args.get("q"))
+    if not terms:
+        return jsonify({"error": "q needs at least one word of 2+ characters"}), 400
+
+    try:
+        fields = TASK_FIELDS.requested()
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20)
+        cursor = request.args.get("cursor")
+        offset = int(decode_cursor(cursor, SEARCH_CURSOR)[0]) if cursor else 0
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    # Ranking reads title, description and created_at whatever is asked for.
+    projection = TASK_FIELDS.projection(fields, also=("title", "description", "created_at"))
+    serialize = TASK_FIELDS.serializer(serialize_task, fields)
+
+    # Only the newest MAX_SEARCH_CANDIDATES matches are ranked; the index
+    # order keeps that set (and so every page) stable between requests.
+    candidates = list(
+        db.tasks.find(search_filter(user_id, terms), projection or FULL_TASK)
+        .sort(SEARCH_CANDIDATE_SORT)
+        .limit(MAX_SEARCH_CANDIDATES)
+    )
+    ranked = [(score(doc, terms), doc) for doc in candidates]
+    ranked = [item for item in ranked if item[0] > 0]
+    ranked.sort(key=lambda item: (item[0], item[1].get("created_at") or datetime.min), reverse=True)
+
+    page = ranked[offset:offset + limit]
+    more = offset + limit < len(ranked)
+    return jsonify({
+        "tasks": [{**serialize(doc), "score": s} for s, doc in page],
+        "next_cursor": encode_cursor({"offset": offset + limit}, SEARCH_CURSOR) if more else None,
+        "capped": len(candidates) == MAX_SEARCH_CANDIDATES,
+    })
+
+
 @bp.post("")
 def create_task():
     """
     POST /tasks
-    Body: { title, description?, date, due_at?, priority?, category?, completed? }
+    Body: { title, description?, date, due_at?, priority?, category?, completed?,
+            recurrence? }
+
+    `recurrence` repeats the task from `date` instead of storing one task
+    per occurrence: { freq: daily|weekly|monthly, interval?, byweekday?,
+    until? | count?, exdates? }.
     """
     try:
         db = get_db()
         user_id = get_default_user_id()
         data = request.get_json(silent=True) or {}
 
-        doc = {
-            "user_id": user_id,
-            "title": data.get("title", "").strip(),
-            "description": data.get("description", "").strip(),
-            "date": data.get("date"),
-            "due_at": data.get("due_at"),
-            "priority": data.get("priority", "Medium"),
-            "category": data.get("category", "Personal"),
-            "completed": bool(data.get("completed", False)),
-            "created_at": datetime.utcnow(),
-        }
+        now = datetime.utcnow()
+        try:
+            doc = new_task_doc(data, user_id, now)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
         result = db.tasks.insert_one(doc)
+        if doc["completed"]:
+            record_task_completion(db, user_id, day_key(now))
+        bump_data_version(db, user_id)
         return (
             jsonify({"id": str(result.inserted_id), "message": "Task created successfully"}),
             201,
@@ -111,24 +425,175 @@ def update_task(task_id: str):
     if not existing:
         return jsonify({"error": "Task not found"}), 404
 
-    update_doc = {
-        "title": data.get("title", existing.get("title", "")).strip(),
-        "description": data.get("description", existing.get("description", "")).strip(),
-        "date": data.get("date", existing.get("date")),
-        "due_at": data.get("due_at", existing.get("due_at")),
-        "priority": data.get("priority", existing.get("priority", "Medium")),
-        "category": data.get("category", existing.get("category", "Personal")),
-        "completed": bool(data.get("completed", existing.get("completed", False))),
-    }
-
-    db.tasks.update_one({"_id": oid, "user_id": user_id}, {"$set": update_doc})
+    try:
+        update_ops, delta = task_update_ops(existing, data, datetime.utcnow())
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    db.tasks.update_one({"_id": oid, "user_id": user_id}, update_ops)
+
+    if delta > 0:
+        record_task_completion(db, user_id, day_key(update_ops["$set"]["completed_at"]))
+    elif delta < 0:
+        record_task_completion(db, user_id, completion_day(existing), -1)
+    bump_data_version(db, user_id)
     return jsonify({"message": "Task updated successfully"})
 
 
+# Fields PATCH /tasks/<id> may set; anything else in the body is ignored.
+PATCHABLE_FIELDS = ("title", "description", "date", "due_at", "priority", "category", "completed", "recurrence")
+
+
+def _expected_version(data: Dict[str, Any]) -> int | None:
+    """
+    Version the client based its edit on: the If-Match header (an ETag
+    such as "3" or W/"3") or a `version` body field. None when absent.
+    Raises ValueError when malformed.
+    """
+    header = request.headers.get("If-Match")
+    if header and header.strip() != "*":
+        return int(header.strip().removeprefix("W/").strip('"'))
+    if data.get("version") is not None:
+        return int(data["version"])
+    return None
+
+
+def _patch_stage(changes: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """
+    $set stage of the pipeline update applying `changes` to a whole task.
+
+    A pipeline, so completed_at can follow the stored state without
+    reading it first. Values are $literal so strings starting with "$"
+    are not taken for field paths.
+    """
+    stage: Dict[str, Any] = {name: {"$literal": value} for name, value in changes.items()}
+    stage["version"] = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+    if "recurrence" in changes and changes["recurrence"] is None:
+        stage["recurrence"] = "$$REMOVE"
+    if changes.get("completed") is True:
+        stage["completed_at"] = {"$cond": [{"$eq": ["$completed", True]}, "$completed_at", now]}
+    elif changes.get("completed") is False:
+        stage["completed_at"] = "$$REMOVE"
+    # search_terms is the union of both texts' terms; an edit of one text
+    # rebuilds it from the other's stored terms in this same update.
+    # Tasks from before the per-text fields fall back to search_terms.
+    if "title" in changes or "description" in changes:
+        parts = []
+        for name in ("title", "description"):
+            if name in changes:
+                terms = text_terms(changes[name])
+                stage[f"{name}_terms"] = {"$literal": terms}
+                parts.append({"$literal": terms})
+            else:
+                parts.append({"$ifNull": [f"${name}_terms", {"$ifNull": ["$search_terms", []]}]})
+        stage["search_terms"] = {"$setUnion": parts}
+    return stage
+
+
+@bp.patch("/<task_id>")
+def patch_task(task_id: str):
+    """
+    PATCH /tasks/<id>
+    Body: any of { title, description, date, due_at, priority, category,
+    completed, recurrence } plus optional `version` (or an If-Match header).
+    Optional query param: occurrence (YYYY-MM-DD) to set `completed` of
+    just that date of a recurring task; no other field may be given then.
+
+    Sets only the supplied fields in one find_one_and_update. With a
+    version, the write only happens if the task is still at that version;
+    otherwise 412 with the current one. Responds with the new version
+    (also as the ETag).
+    """
+    db = get_db()
+    user_id = get_default_user_id()
+    data = request.get_json(silent=True) or {}
+
+    try:
+        oid = ObjectId(task_id)
+    except Exception:
+        return jsonify({"error": "Invalid task id"}), 400
+    try:
+        expected = _expected_version(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid version"}), 400
+    try:
+        occurrence = parse_occurrence(request.args.get("occurrence"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    changes = {name: data[name] for name in PATCHABLE_FIELDS if name in data}
+    for name in ("title", "description"):
+        if name in changes:
+            changes[name] = str(changes[name] or "").strip()
+    if "completed" in changes:
+        changes["completed"] = bool(changes["completed"])
+    if "recurrence" in changes:
+        # The anchor is only checked when it comes with the rule; series
+        # with an unusable date are skipped when listing.
+        try:
+            if "date" in changes:
+                changes["recurrence"] = series_rule(changes["recurrence"], changes["date"])
+            else:
+                changes["recurrence"] = parse_rule(changes["recurrence"])
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+    if not changes:
+        return jsonify({"error": f"Nothing to update; patchable fields: {', '.join(PATCHABLE_FIELDS)}"}), 400
+    if occurrence and set(changes) != {"completed"}:
+        return jsonify({"error": "Only completed can be set for one occurrence"}), 400
+
+    query: Dict[str, Any] = {"_id": oid, "user_id": user_id}
+    if expected is not None:
+        # Tasks created before versioning have no field; they count as 0.
+        query["version"] = {"$in": [0, None]} if expected == 0 else expected
+
+    now = datetime.utcnow()
+    if occurrence:
+        query["recurrence"] = {"$exists": True}
+        before = db.tasks.find_one_and_update(
+            query,
+            occurrence_completion_ops(occurrence, changes["completed"], now),
+            projection={"completed_dates": 1, "occurrence_completed_at": 1, "version": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+    else:
+        before = db.tasks.find_one_and_update(
+            query,
+            [{"$set": _patch_stage(changes, now)}],
+            projection={"completed": 1, "completed_at": 1, "created_at": 1, "version": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+    if before is None:
+        current = db.tasks.find_one({"_id": oid, "user_id": user_id}, {"version": 1, "recurrence": 1})
+        if current is None or (occurrence and "recurrence" not in current):
+            return jsonify({"error": "Task not found"}), 404
+        return jsonify({"error": "Task was modified", "version": int(current.get("version", 0))}), 412
+
+    version = int(before.get("version", 0)) + 1
+
+    if occurrence:
+        was_completed = occurrence in (before.get("completed_dates") or [])
+        undone_day = occurrence_completion_day(before, occurrence)
+    else:
+        was_completed = bool(before.get("completed", False))
+        undone_day = completion_day(before)
+    if changes.get("completed") is True and not was_completed:
+        record_task_completion(db, user_id, day_key(now))
+    elif changes.get("completed") is False and was_completed:
+        record_task_completion(db, user_id, undone_day, -1)
+    if "completed" in changes or "category" in changes:
+        bump_data_version(db, user_id)
+
+    response = jsonify({"message": "Task updated successfully", "version": version})
+    response.set_etag(str(version))
+    return response
+
+
 @bp.delete("/<task_id>")
 def delete_task(task_id: str):
     """
     DELETE /tasks/<id>
+    Optional query param: occurrence (YYYY-MM-DD) to skip just that date
+    of a recurring task instead of deleting the series.
     """
     db = get_db()
     user_id = get_default_user_id()
@@ -138,7 +603,42 @@ def delete_task(task_id: str):
     except Exception:
         return jsonify({"error": "Invalid task id"}), 400
 
-    db.tasks.delete_one({"_id": oid, "user_id": user_id})
+    try:
+        day = parse_occurrence(request.args.get("occurrence"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if day:
+        before = db.tasks.find_one_and_update(
+            {"_id": oid, "user_id": user_id, "recurrence": {"$exists": True}},
+            {
+                "$addToSet": {"recurrence.exdates": day},
+                "$pull": {"completed_dates": day},
+                "$unset": {f"occurrence_completed_at.{day}": ""},
+                "$inc": {"version": 1},
+            },
+            projection={"completed_dates": 1, "occurrence_completed_at": 1},
+        )
+        if before is None:
+            return jsonify({"error": "Recurring task not found"}), 404
+        if day in (before.get("completed_dates") or []):
+            record_task_completion(db, user_id, occurrence_completion_day(before, day), -1)
+            bump_data_version(db, user_id)
+        return jsonify({"message": "Occurrence removed successfully"})
+
+    deleted = db.tasks.find_one_and_delete(
+        {"_id": oid, "user_id": user_id},
+        projection={
+            "completed": 1,
+            "completed_at": 1,
+            "created_at": 1,
+            "completed_dates": 1,
+            "occurrence_completed_at": 1,
+        },
+    )
+    if deleted:
+        for day, delta in completion_deltas(deleted).items():
+            record_task_completion(db, user_id, day, delta)
+        bump_data_version(db, user_id)
     return jsonify({"message": "Task deleted successfully"})
 
 
@@ -147,9 +647,15 @@ def complete_task(task_id: str):
     """
     PATCH /tasks/<id>/complete
     Marks task as completed=true and creates a star in the galaxy.
+    Optional query param: occurrence (YYYY-MM-DD) to complete just that
+    date of a recurring task, with a star of its own.
+
+    Idempotent: only the request that actually flips `completed` (or adds
+    the occurrence) creates the star; repeats (double clicks, retries)
+    answer with celestial=null.
     """
     from ..utils.star_logic import create_celestial_for_session
-    
+
     db = get_db()
     user_id = get_default_user_id()
 
@@ -157,38 +663,245 @@ def complete_task(task_id: str):
         oid = ObjectId(task_id)
     except Exception:
         return jsonify({"error": "Invalid task id"}), 400
+    try:
+        occurrence = parse_occurrence(request.args.get("occurrence"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Flip the flag and read the pre-image in one round trip; the filter
+    # makes concurrent completions race for a single winner.
+    now = datetime.utcnow()
+    found: Dict[str, Any] = {"_id": oid, "user_id": user_id}
+    if occurrence:
+        found["recurrence"] = {"$exists": True}
+        query = {**found, "completed_dates": {"$ne": occurrence}}
+        update = occurrence_completion_ops(occurrence, True, now)
+    else:
+        query = {**found, "completed": {"$ne": True}}
+        update = {"$set": {"completed": True, "completed_at": now}, "$inc": {"version": 1}}
+    task = db.tasks.find_one_and_update(
+        query,
+        update,
+        projection={"title": 1, "category": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if task is None:
+        if db.tasks.find_one(found, {"_id": 1}) is None:
+            return jsonify({"error": "Task not found"}), 404
+        return jsonify({"message": "Task already completed", "celestial": None})
 
-    # Get the task details before updating
-    task = db.tasks.find_one({"_id": oid, "user_id": user_id})
-    if not task:
-        return jsonify({"error": "Task not found"}), 404
+    record_task_completion(db, user_id, day_key(now))
 
-    # Update task as completed
-    db.tasks.update_one({"_id": oid, "user_id": user_id}, {"$set": {"completed": True}})
-    
     # Create a celestial object for the completed task
-    # Use a fixed duration for task completion (e.g., 15 minutes equivalent)
-    # This creates a small star for each completed task
-    celestial = create_celestial_for_session(
-        db=db,
-        session_id=f"task-{task_id}",
-        duration_minutes=15.0,  # Fixed duration for task completion
-        mood="happy",  # Use a bright color for task completion
-        meta={
-            "source": "task_completion",
-            "task_id": task_id,
-            "task_title": task.get("title", ""),
-            "task_category": task.get("category", "Personal")
-        }
-    )
-    
+    celestial = create_celestial_for_session(db=db, **completion_star_spec(task_id, task, occurrence))
+    bump_data_version(db, user_id)
+
     return jsonify({
         "message": "Task marked as completed",
         "celestial": {
-            "id": str(celestial.meta.get("_id")) if "_id" in celestial.meta else None,
+            "id": str(celestial.id),
             "type": celestial.type,
             "color": celestial.color
         }
     })
 
 
+# Largest number of operations one /tasks/batch call may carry.
+MAX_BATCH_OPS = 200
+
+
+def _completed_at(task: Dict[str, Any], occurrence: str | None) -> datetime | None:
+    if occurrence:
+        return (task.get("occurrence_completed_at") or {}).get(occurrence)
+    return task.get("completed_at")
+
+
+@bp.post("/batch")
+def batch_tasks():
+    """
+    POST /tasks/batch
+    Body: { ops: [
+        { op: "create", task: {...} },
+        { op: "update", id, task: {...} },
+        { op: "delete", id },
+        { op: "complete", id, occurrence? },
+    ] }
+
+    Applies the operations in order with a single bulk_write and creates
+    the stars for all completions with one insert_many (completing a task
+    that is already completed is a no-op). `occurrence` (YYYY-MM-DD)
+    completes one date of a recurring task, as
+    PATCH /tasks/<id>/complete?occurrence= does. Returns one result per
+    op: { op, id, ok, error? } plus the stars created.
+    """
+    from ..utils.star_logic import create_celestials_batch
+
+    db = get_db()
+    user_id = get_default_user_id()
+    data = request.get_json(silent=True) or {}
+    ops = data.get("ops")
+
+    if not isinstance(ops, list) or not ops:
+        return jsonify({"error": "ops must be a non-empty list"}), 400
+    if len(ops) > MAX_BATCH_OPS:
+        return jsonify({"error": f"At most {MAX_BATCH_OPS} ops per batch"}), 400
+
+    parsed = []
+    for i, op in enumerate(ops):
+        kind = op.get("op") if isinstance(op, dict) else None
+        if kind not in ("create", "update", "delete", "complete"):
+            return jsonify({"error": f"ops[{i}]: unknown op"}), 400
+        if kind == "create":
+            parsed.append((kind, None, op.get("task") or {}, None))
+            continue
+        try:
+            oid = ObjectId(op.get("id"))
+        except Exception:
+            return jsonify({"error": f"ops[{i}]: invalid task id"}), 400
+        try:
+            occurrence = parse_occurrence(op.get("occurrence")) if kind == "complete" else None
+        except ValueError:
+            return jsonify({"error": f"ops[{i}]: invalid occurrence"}), 400
+        parsed.append((kind, oid, op.get("task") or {}, occurrence))
+
+    # One read for every task the batch touches; later ops see the effect
+    # of earlier ones through this local copy.
+    ids = [oid for _, oid, _, _ in parsed if oid is not None]
+    current: Dict[ObjectId, Dict[str, Any] | None] = {
+        doc["_id"]: doc for doc in db.tasks.find({"_id": {"$in": ids}, "user_id": user_id})
+    } if ids else {}
+
+    # Millisecond precision, as MongoDB stores it, so completions can be
+    # recognised by their completed_at after the write.
+    now = datetime.utcnow()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    writes: List[Any] = []
+    results: List[Dict[str, Any]] = []
+    completions: Dict[str, int] = {}
+    star_tasks: List[Tuple[str, Dict[str, Any], str | None]] = []
+
+    for kind, oid, payload, occurrence in parsed:
+        if kind == "create":
+            try:
+                doc = {"_id": ObjectId(), **new_task_doc(payload, user_id, now)}
+            except ValueError as exc:
+                results.append({"op": kind, "id": None, "ok": False, "error": str(exc)})
+                continue
+            writes.append(InsertOne(doc))
+            current[doc["_id"]] = doc
+            if doc["completed"]:
+                completions[day_key(now)] = completions.get(day_key(now), 0) + 1
+            results.append({"op": kind, "id": str(doc["_id"]), "ok": True})
+            continue
+
+        existing = current.get(oid)
+        if existing is None:
+            results.append({"op": kind, "id": str(oid), "ok": False, "error": "Task not found"})
+            continue
+
+        if kind == "delete":
+            writes.append(DeleteOne({"_id": oid, "user_id": user_id}))
+            current[oid] = None
+            for day, delta in completion_deltas(existing).items():
+                completions[day] = completions.get(day, 0) + delta
+        elif kind == "update":
+            try:
+                update_ops, delta = task_update_ops(existing, payload, now)
+            except ValueError as exc:
+                results.append({"op": kind, "id": str(oid), "ok": False, "error": str(exc)})
+                continue
+            writes.append(UpdateOne({"_id": oid, "user_id": user_id}, update_ops))
+            updated = {**existing, **update_ops["$set"], "version": existing.get("version", 0) + 1}
+            for name in update_ops.get("$unset", {}):
+                updated.pop(name, None)
+            if delta < 0:
+                day = completion_day(existing)
+                completions[day] = completions.get(day, 0) - 1
+            elif delta > 0:
+                completions[day_key(now)] = completions.get(day_key(now), 0) + 1
+            current[oid] = updated
+        elif occurrence:
+            if not existing.get("recurrence"):
+                results.append({"op": kind, "id": str(oid), "ok": False, "error": "Task not found"})
+                continue
+            if occurrence not in (existing.get("completed_dates") or []):
+                writes.append(
+                    UpdateOne(
+                        {"_id": oid, "user_id": user_id, "completed_dates": {"$ne": occurrence}},
+                        occurrence_completion_ops(occurrence, True, now),
+                    )
+                )
+                current[oid] = {
+                    **existing,
+                    "completed_dates": [*(existing.get("completed_dates") or []), occurrence],
+                    "occurrence_completed_at": {**(existing.get("occurrence_completed_at") or {}), occurrence: now},
+                    "version": existing.get("version", 0) + 1,
+                }
+                completions[day_key(now)] = completions.get(day_key(now), 0) + 1
+                star_tasks.append((str(oid), existing, occurrence))
+        else:
+            if not existing.get("completed"):
+                writes.append(
+                    UpdateOne(
+                        {"_id": oid, "user_id": user_id, "completed": {"$ne": True}},
+                        {"$set": {"completed": True, "completed_at": now}, "$inc": {"version": 1}},
+                    )
+                )
+                current[oid] = {
+                    **existing,
+                    "completed": True,
+                    "completed_at": now,
+                    "version": existing.get("version", 0) + 1,
+                }
+                completions[day_key(now)] = completions.get(day_key(now), 0) + 1
+                star_tasks.append((str(oid), existing, None))
+        results.append({"op": kind, "id": str(oid), "ok": True})
+
+    if writes:
+        db.tasks.bulk_write(writes, ordered=True)
+
+    # The plan above came from one snapshot; a task completed by another
+    # request in the meantime makes its conditional UpdateOne a no-op.
+    # Keep stars (and counts) only for completions that actually landed.
+    # Tasks a later op in this batch deleted or reopened cannot be checked
+    # this way and keep the planned outcome.
+    checkable = [
+        (task_id, occurrence)
+        for task_id, _, occurrence in star_tasks
+        if _completed_at(current.get(ObjectId(task_id)) or {}, occurrence) == now
+    ]
+    if checkable:
+        stored = {
+            str(doc["_id"]): doc
+            for doc in db.tasks.find(
+                {"_id": {"$in": [ObjectId(task_id) for task_id, _ in checkable]}},
+                {"completed_at": 1, "occurrence_completed_at": 1},
+            )
+        }
+        lost = {
+            (task_id, occurrence)
+            for task_id, occurrence in checkable
+            if _completed_at(stored.get(task_id) or {}, occurrence) != now
+        }
+        if lost:
+            star_tasks = [entry for entry in star_tasks if (entry[0], entry[2]) not in lost]
+            completions[day_key(now)] -= len(lost)
+    for day, delta in completions.items():
+        if delta:
+            record_task_completion(db, user_id, day, delta)
+
+    stars = create_celestials_batch(
+        db=db,
+        user_id=user_id,
+        specs=[completion_star_spec(task_id, task, occurrence) for task_id, task, occurrence in star_tasks],
+    )
+    if writes or stars:
+        bump_data_version(db, user_id)
+
+    return jsonify({
+        "results": results,
+        "celestial": [
+            {"id": str(obj.id), "task_id": task_id, "occurrence": occurrence, "type": obj.type, "color": obj.color}
+            for (task_id, _, occurrence), obj in zip(star_tasks, stars)
+        ],
+    })
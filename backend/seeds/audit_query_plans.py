@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from bson import ObjectId
+from bson.son import SON
+
+from backend.routes.tasks import SEARCH_CANDIDATE_SORT, TASK_SORT
+from backend.utils.db import INDEXES, ensure_indexes, get_client
+from backend.utils.pagination import keyset_filter
+from backend.utils.search import MAX_SEARCH_CANDIDATES, TERM_FIELDS, search_filter, search_terms
+from backend.utils.spatial import bbox_query, tile_fields
+
+
+AUDIT_DATABASE = "codegalaxy_plan_audit"
+
+# Seeded volume: enough documents that a scan or blocking sort is clearly
+# visible in the numbers, small enough to seed in a few seconds.
+SEED_USERS = 4
+SEED_DOCS_PER_USER = 400
+
+AUDIT_USER = "audit-user-0"
+
+CATEGORIES = ("Personal", "Work", "Life", "Study")
+MOODS = ("calm", "focus", "happy", "energy", "neutral")
+
+
+@dataclass
+class QueryShape:
+    """
+    One query a route issues, with the user/values filled in. Either a
+    find (filter/sort/projection/limit) or an aggregation (pipeline).
+    """
+
+    route: str
+    collection: str
+    filter: Dict[str, Any] = field(default_factory=dict)
+    sort: List[Tuple[str, int]] | None = None
+    projection: Dict[str, Any] | None = None
+    limit: int = 0
+    pipeline: List[Dict[str, Any]] | None = None
+    # Small, bounded result sets (deltas, viewports) may sort in memory.
+    in_memory_sort_ok: bool = False
+    # Documents fetched per document returned before the shape counts as
+    # regressed; residual filters (bbox edges, `completed`) need slack.
+    max_examined_ratio: float = 1.5
+
+
+def query_shapes(user_id: str, now: datetime, per_user: int = SEED_DOCS_PER_USER) -> List[QueryShape]:
+    """
+    The query shapes of routes/*.py (and the helpers they call), in the
+    form they reach MongoDB.
+    """
+    today = now.strftime("%Y-%m-%d")
+    week_ago = (now - timedelta(days=6)).strftime("%Y-%m-%d")
+    day_start = datetime(now.year, now.month, now.day)
+    user = {"user_id": user_id}
+    month_ago = (now - timedelta(days=30)).strftime("%Y-%m-%d")
+    task_page = keyset_filter(TASK_SORT, [month_ago, None, now, ObjectId()])
+    recent_rev = max(per_user - 20, 0)
+    single = {"recurrence": {"$exists": False}, "date": {"$gte": month_ago, "$lte": today}}
+    series = {"recurrence": {"$exists": True}, "date": {"$lte": today}, "recurrence.until": {"$not": {"$lt": month_ago}}}
+
+    return [
+        # tasks.py
+        QueryShape("GET /tasks", "tasks", user, TASK_SORT),
+        QueryShape("GET /tasks?category", "tasks", {**user, "category": "Work"}, TASK_SORT),
+        QueryShape(
+            "GET /tasks?completed", "tasks", {**user, "completed": True}, TASK_SORT, max_examined_ratio=4
+        ),
+        QueryShape(
+            "GET /tasks?category&completed",
+            "tasks",
+            {**user, "category": "Work", "completed": False},
+            TASK_SORT,
+            max_examined_ratio=4,
+        ),
+        QueryShape("GET /tasks?limit&cursor", "tasks", {"$and": [user, task_page]}, TASK_SORT, limit=21),
+        QueryShape("GET /tasks?from&to", "tasks", {**user, **single}, TASK_SORT),
+        QueryShape("GET /tasks?from&to (series)", "tasks", {**user, **series}),
+        QueryShape("PUT /tasks/<id>", "tasks", {"_id": ObjectId(), **user}),
+        QueryShape(
+            "GET /tasks/search",
+            "tasks",
+            search_filter(user_id, ["task", "12"]),
+            SEARCH_CANDIDATE_SORT,
+            projection={name: 0 for name in TERM_FIELDS},
+            limit=MAX_SEARCH_CANDIDATES,
+        ),
+        # sessions.py / stats.py
+        QueryShape(
+            "GET /sessions/today",
+            "sessions",
+            {**user, "started_at": {"$gte": day_start, "$lte": day_start + timedelta(days=1)}},
+            [("started_at", 1)],
+        ),
+        QueryShape(
+            "GET /stats/range",
+            "sessions",
+            {**user, "started_at": {"$gte": now - timedelta(days=365), "$lt": now}},
+            projection={"_id": 0, "started_at": 1, "duration_minutes": 1, "mood": 1},
+        ),
+        QueryShape("GET /stats/summary (tasks)", "tasks", user, projection={"_id": 1}),
+        QueryShape(
+            "GET /stats/summary (rollup)",
+            "daily_stats",
+            pipeline=[
+                {"$match": user},
+                {"$group": {"_id": None, "focus_minutes": {"$sum": "$focus_minutes"}}},
+            ],
+        ),
+        QueryShape(
+            "GET /stats/weekly",
+            "daily_stats",
+            {**user, "day": {"$gte": week_ago, "$lte": today}},
+            [("day", 1)],
+            projection={"_id": 0, "day": 1, "focus_minutes": 1},
+        ),
+        QueryShape(
+            "GET /stats/dashboard (galaxy)",
+            "celestial_objects",
+            pipeline=[{"$match": user}, {"$group": {"_id": "$type", "count": {"$sum": 1}}}],
+        ),
+        QueryShape("GET /stats/streak", "streaks", user),
+        QueryShape("GET /stats/heatmap", "focus_heatmap", user),
+        QueryShape("stats cache version", "data_versions", user),
+        # calendar.py
+        QueryShape(
+            "GET /calendar?month&year",
+            "calendar_events",
+            {**user, **single},
+            [("date", 1), ("time", 1)],
+        ),
+        QueryShape("GET /calendar?month&year (series)", "calendar_events", {**user, **series}),
+        # moods.py
+        QueryShape("GET /moods", "moods", {}, [("order", 1)]),
+        QueryShape("GET /moods/<key>", "moods", {"key": "calm"}),
+        # galaxy.py
+        QueryShape("GET /api/galaxy/data", "celestial_objects", user, [("created_at", 1)]),
+        QueryShape(
+            "GET /api/galaxy/data?since",
+            "celestial_objects",
+            {**user, "rev": {"$gt": recent_rev}},
+            [("created_at", 1)],
+            in_memory_sort_ok=True,
+        ),
+        QueryShape(
+            "GET /api/galaxy/data?since (tombstones)",
+            "galaxy_tombstones",
+            {**user, "rev": {"$gt": recent_rev}},
+        ),
+        QueryShape(
+            "GET /api/galaxy/data?bbox",
+            "celestial_objects",
+            bbox_query(user_id, (-300.0, -300.0, 300.0, 300.0)),
+            [("created_at", 1)],
+            in_memory_sort_ok=True,
+            max_examined_ratio=4,
+        ),
+        QueryShape("galaxy revision state", "galaxy_revisions", user),
+        QueryShape(
+            "POST /api/galaxy/reset (batch)",
+            "sessions",
+            {**user, "created_at": {"$not": {"$gt": now}}},
+            projection={"_id": 1},
+            limit=500,
+        ),
+        QueryShape(
+            "POST /api/galaxy/reset (layout batch)",
+            "galaxy_layout",
+            {**user, "created_at": {"$not": {"$gt": now}}},
+            projection={"_id": 1},
+            limit=500,
+        ),
+        QueryShape("GET /api/galaxy/reset/<id>", "reset_jobs", {"_id": ObjectId(), **user}),
+    ]
+
+
+def seed(db, now: datetime, users: int = SEED_USERS, per_user: int = SEED_DOCS_PER_USER) -> None:
+    """
+    Fill the audit database with synthetic data shaped like production's.
+    """
+    rng = random.Random(7)
+    db.moods.insert_many([{"key": m, "label": m.title(), "order": i} for i, m in enumerate(MOODS)])
+
+    for u in range(users):
+        user_id = f"audit-user-{u}"
+        tasks, sessions, stars, events, days, tombstones, layout = [], [], [], [], [], [], []
+        for i in range(per_user):
+            when = now - timedelta(days=rng.randint(0, 400), minutes=rng.randint(0, 1440))
+            day = when.strftime("%Y-%m-%d")
+            tasks.append({
+                "user_id": user_id,
+                "title": f"Task {i}",
+                "search_terms": search_terms(f"Task {i}", None),
+                "date": day if rng.random() < 0.9 else None,
+                "due_at": f"{day}T{rng.randint(0, 23):02d}:00" if rng.random() < 0.5 else None,
+                "category": rng.choice(CATEGORIES),
+                "completed": rng.random() < 0.3,
+                "created_at": when,
+            })
+            sessions.append({
+                "user_id": user_id,
+                "mood": rng.choice(MOODS),
+                "duration_minutes": float(rng.randint(5, 90)),
+                "started_at": when,
+                "created_at": when,
+            })
+            x, y = rng.uniform(-2000, 2000), rng.uniform(-2000, 2000)
+            stars.append({
+                "user_id": user_id,
+                "x": x,
+                "y": y,
+                **tile_fields(x, y),
+                "type": rng.choice(("star", "planet", "comet")),
+                "created_at": when,
+                "rev": i + 1,
+            })
+            events.append({"user_id": user_id, "title": f"Event {i}", "date": day, "time": "09:00", "created_at": when})
+            tombstones.append({"user_id": user_id, "object_id": str(ObjectId()), "rev": i + 1})
+            layout.append({"user_id": user_id, "created_at": when})
+        for d in range(per_user):
+            days.append({
+                "user_id": user_id,
+                "day": (now - timedelta(days=d)).strftime("%Y-%m-%d"),
+                "focus_minutes": float(rng.randint(0, 300)),
+                "sessions": rng.randint(0, 8),
+                "tasks_completed": rng.randint(0, 5),
+            })
+
+        db.tasks.insert_many(tasks)
+        db.sessions.insert_many(sessions)
+        db.celestial_objects.insert_many(stars)
+        db.calendar_events.insert_many(events)
+        db.daily_stats.insert_many(days)
+        db.galaxy_tombstones.insert_many(tombstones)
+        db.galaxy_layout.insert_many(layout)
+        db.streaks.insert_one({"user_id": user_id, "current": 1, "longest": 3, "last_day": days[0]["day"]})
+        db.data_versions.insert_one({"user_id": user_id, "v": 1})
+        db.focus_heatmap.insert_one({"user_id": user_id, "minutes": {}, "sessions": {}})
+        db.galaxy_revisions.insert_one({"user_id": user_id, "rev": per_user})
+
+
+def explain(db, shape: QueryShape) -> Dict[str, Any]:
+    if shape.pipeline is not None:
+        command: Dict[str, Any] = {"aggregate": shape.collection, "pipeline": shape.pipeline, "cursor": {}}
+    else:
+        command = {"find": shape.collection, "filter": shape.filter}
+        if shape.sort:
+            command["sort"] = SON(shape.sort)
+        if shape.projection:
+            command["projection"] = shape.projection
+        if shape.limit:
+            command["limit"] = shape.limit
+    return db.command(SON([("explain", command), ("verbosity", "executionStats")]))
+
+
+_CHILD_KEYS = ("inputStage", "outerStage", "innerStage", "thenStage", "elseStage", "queryPlan")
+
+
+def _stages(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for key in _CHILD_KEYS:
+        if isinstance(plan.get(key), dict):
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages") or []:
+        yield from _stages(child)
+
+
+def _find_key(doc: Any, key: str) -> Any:
+    """
+    First value stored under `key` anywhere in an explain document; the
+    position of queryPlanner/executionStats varies with the pipeline.
+    """
+    if isinstance(doc, dict):
+        if key in doc:
+            return doc[key]
+        children = doc.values()
+    elif isinstance(doc, list):
+        children = doc
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The parts of an explain result the audit judges a plan by.
+    """
+    planner = _find_key(result, "queryPlanner") or {}
+    stats = _find_key(result, "executionStats") or {}
+    stages = list(_stages(planner.get("winningPlan") or {}))
+    names = [s.get("stage") for s in stages if s.get("stage")]
+    return {
+        "plan": " <- ".join(names),
+        "indexes": sorted({s["indexName"] for s in stages if s.get("indexName")}),
+        "collscan": "COLLSCAN" in names,
+        "in_memory_sort": any(n in ("SORT", "SORT_KEY_GENERATOR") for n in names),
+        "docs_examined": int(stats.get("totalDocsExamined", 0)),
+        "keys_examined": int(stats.get("totalKeysExamined", 0)),
+        "returned": int(stats.get("nReturned", 0)),
+    }
+
+
+def problems(shape: QueryShape, summary: Dict[str, Any]) -> List[str]:
+    found = []
+    if summary["collscan"]:
+        found.append("COLLSCAN")
+    if summary["in_memory_sort"] and not shape.in_memory_sort_ok:
+        found.append("in-memory SORT")
+    allowed = max(summary["returned"], 1) * shape.max_examined_ratio
+    if summary["docs_examined"] > allowed:
+        found.append(f"examined {summary['docs_examined']} docs for {summary['returned']} returned")
+    return found
+
+
+def suggest_index(shape: QueryShape) -> List[Tuple[str, int]]:
+    """
+    Index for a shape by the equality / sort / range rule: exact-match
+    fields first, then the sort keys, then range-filtered fields.
+    """
+    filt = shape.filter
+    if shape.pipeline:
+        filt = next((s["$match"] for s in shape.pipeline if "$match" in s), {})
+    equality, ranges = [], []
+    for name, value in filt.items():
+        if name.startswith("$") or name == "_id":
+            continue
+        (ranges if isinstance(value, dict) else equality).append(name)
+    keys = [(name, 1) for name in equality]
+    for name, direction in shape.sort or []:
+        if name not in equality:
+            keys.append((name, direction))
+    keys += [(name, 1) for name in ranges if name not in dict(keys)]
+    return keys
+
+
+def run(argv: List[str] | None = None) -> int:
+    """
+    Seed a scratch database, explain every route query shape against the
+    indexes ensure_indexes() creates, and report each plan. Exits non-zero
+    when a shape scans the collection, sorts in memory where it should
+    not, or examines far more documents than it returns.
+    """
+    parser = argparse.ArgumentParser(description="Audit the query plans of the API routes.")
+    parser.add_argument("--database", default=AUDIT_DATABASE, help="scratch database (dropped first)")
+    parser.add_argument("--users", type=int, default=SEED_USERS)
+    parser.add_argument("--docs", type=int, default=SEED_DOCS_PER_USER, help="documents per user and collection")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database afterwards")
+    parser.add_argument("--json", action="store_true", help="print a machine-readable report")
+    args = parser.parse_args(argv)
+
+    if args.database == "codegalaxy":
+        print("Refusing to audit against the application database; it is dropped first.")
+        return 2
+
+    client = get_client()
+    if client is None:
+        print("MongoDB is not reachable; set MONGODB_URI.")
+        return 2
+    db = client[args.database]
+    client.drop_database(args.database)
+
+    now = datetime.utcnow().replace(microsecond=0)
+    try:
+        ensure_indexes(db)
+        seed(db, now, args.users, args.docs)
+
+        report = []
+        for shape in query_shapes(AUDIT_USER, now, args.docs):
+            summary = summarize(explain(db, shape))
+            if shape.pipeline is not None:
+                # Grouping stages return far fewer documents than they read;
+                # judge the scan against what the $match selects instead.
+                match = next((s["$match"] for s in shape.pipeline if "$match" in s), {})
+                summary["returned"] = db[shape.collection].count_documents(match)
+            issues = problems(shape, summary)
+            report.append({
+                "route": shape.route,
+                "collection": shape.collection,
+                **summary,
+                "problems": issues,
+                "suggested_index": suggest_index(shape) if issues else None,
+            })
+    finally:
+        if not args.keep:
+            client.drop_database(args.database)
+
+    failures = [r for r in report if r["problems"]]
+    index_set = [
+        {"collection": c, "keys": keys, **options} for c, keys, options in INDEXES
+    ] + [
+        {"collection": r["collection"], "keys": r["suggested_index"], "suggested_for": r["route"]}
+        for r in failures
+        if r["suggested_index"]
+    ]
+
+    if args.json:
+        print(json.dumps({"shapes": report, "indexes": index_set}, indent=2, default=str))
+    else:
+        for r in report:
+            status = "FAIL" if r["problems"] else "ok"
+            print(
+                f"{status:4}  {r['route']:42} {r['plan'] or '-':40} "
+                f"docs {r['docs_examined']:>5} keys {r['keys_examined']:>5} returned {r['returned']:>5}"
+                f"  {', '.join(r['indexes'])}"
+            )
+            for issue in r["problems"]:
+                print(f"      - {issue}; try {r['suggested_index']}")
+        print("\nIndex set for ensure_indexes():")
+        for entry in index_set:
+            note = f"  # suggested for {entry['suggested_for']}" if "suggested_for" in entry else ""
+            unique = ", unique=True" if entry.get("unique") else ""
+            print(f"  db.{entry['collection']}.create_index({entry['keys']}{unique}){note}")
+
+    print(f"\n{len(report) - len(failures)}/{len(report)} query shapes use a good plan.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from collections import defaultdict
+
+from pymongo import ReplaceOne
+
+from backend.utils.db import get_db
+from backend.utils.rollups import mood_key, task_completion_days
+
+
+# Tasks with something to count: completed ones and recurring ones with
+# completed occurrences.
+COMPLETED = {"$or": [{"completed": True}, {"completed_dates.0": {"$exists": True}}]}
+
+
+def run(missing_only: bool = False) -> None:
+    """
+    Rebuild the daily_stats rollup from raw sessions and tasks.
+
+    Safe to re-run: every (user, day) document is replaced wholesale.
+    With `missing_only`, only users without any rollup yet are built, so
+    live counters of everyone else are left alone.
+    """
+    db = get_db()
+
+    scope = {}
+    if missing_only:
+        done = set(db.daily_stats.distinct("user_id"))
+        users = set(db.sessions.distinct("user_id")) | set(db.tasks.distinct("user_id", COMPLETED))
+        missing = sorted(users - done)
+        if not missing:
+            print("No daily rollups missing.")
+            return
+        scope = {"user_id": {"$in": missing}}
+
+    rollup = defaultdict(
+        lambda: {"focus_minutes": 0.0, "sessions": 0, "tasks_completed": 0, "mood_minutes": {}}
+    )
+
+    pipeline = [
+        {"$match": {**scope, "started_at": {"$type": "date"}}},
+        {
+            "$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$started_at"}},
+                    "mood": "$mood",
+                },
+                "minutes": {"$sum": "$duration_minutes"},
+                "count": {"$sum": 1},
+            }
+        },
+    ]
+    for row in db.sessions.aggregate(pipeline):
+        key = row["_id"]
+        doc = rollup[(key["user_id"], key["day"])]
+        minutes = float(row["minutes"] or 0)
+        mood = mood_key(key.get("mood"))
+        doc["focus_minutes"] += minutes
+        doc["sessions"] += row["count"]
+        doc["mood_minutes"][mood] = doc["mood_minutes"].get(mood, 0.0) + minutes
+
+    completed = db.tasks.find(
+        {**scope, **COMPLETED},
+        {"user_id": 1, "completed": 1, "completed_at": 1, "created_at": 1, "completed_dates": 1, "occurrence_completed_at": 1},
+    )
+    for task in completed:
+        for day in task_completion_days(task):
+            rollup[(task["user_id"], day)]["tasks_completed"] += 1
+
+    ops = [
+        ReplaceOne(
+            {"user_id": user_id, "day": day},
+            {"user_id": user_id, "day": day, **values},
+            upsert=True,
+        )
+        for (user_id, day), values in rollup.items()
+    ]
+    if ops:
+        db.daily_stats.bulk_write(ops, ordered=False)
+
+    print(f"Rebuilt {len(ops)} daily rollup documents.")
+
+
+if __name__ == "__main__":
+    run()
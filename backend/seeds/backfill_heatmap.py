@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from collections import defaultdict
+
+from pymongo import ReplaceOne
+
+from backend.utils.db import get_db
+from backend.utils.rollups import hour_of_week, mood_key
+from backend.utils.streaks import resolve_timezone
+
+
+def run(missing_only: bool = False) -> None:
+    """
+    Rebuild every user's focus heatmap cube from raw sessions.
+
+    Sessions are placed in the time zone last recorded for the user's
+    streak (UTC if none). Safe to re-run: cubes are replaced wholesale.
+    With `missing_only`, only users without a cube yet are built.
+    """
+    db = get_db()
+
+    scope = {}
+    if missing_only:
+        done = set(db.focus_heatmap.distinct("user_id"))
+        missing = sorted(set(db.sessions.distinct("user_id")) - done)
+        if not missing:
+            print("No focus heatmap cubes missing.")
+            return
+        scope = {"user_id": {"$in": missing}}
+
+    zones = {
+        doc["user_id"]: resolve_timezone(doc.get("timezone"))
+        for doc in db.streaks.find({}, {"user_id": 1, "timezone": 1})
+    }
+    cubes = defaultdict(lambda: {"minutes": defaultdict(dict), "sessions": {}})
+
+    sessions = db.sessions.find(
+        {**scope, "started_at": {"$type": "date"}},
+        {"user_id": 1, "started_at": 1, "duration_minutes": 1, "mood": 1},
+    )
+    for s in sessions:
+        user_id = s["user_id"]
+        cell = str(hour_of_week(s["started_at"], zones.get(user_id, resolve_timezone(None))))
+        cube = cubes[user_id]
+        by_cell = cube["minutes"][mood_key(s.get("mood"))]
+        by_cell[cell] = by_cell.get(cell, 0.0) + float(s.get("duration_minutes", 0) or 0)
+        cube["sessions"][cell] = cube["sessions"].get(cell, 0) + 1
+
+    ops = [
+        ReplaceOne(
+            {"user_id": user_id},
+            {"user_id": user_id, "minutes": dict(cube["minutes"]), "sessions": cube["sessions"]},
+            upsert=True,
+        )
+        for user_id, cube in cubes.items()
+    ]
+    if ops:
+        db.focus_heatmap.bulk_write(ops, ordered=False)
+
+    print(f"Rebuilt {len(ops)} focus heatmap cubes.")
+
+
+if __name__ == "__main__":
+    run()
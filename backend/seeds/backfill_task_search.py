@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from pymongo import UpdateOne
+
+from backend.utils.db import get_db
+from backend.utils.search import search_fields
+
+
+BATCH_SIZE = 500
+
+
+def run(missing_only: bool = False) -> None:
+    """
+    Fill the search fields (`title_terms`, `description_terms` and their
+    union `search_terms`) on tasks created before they existed.
+
+    Safe to re-run: the fields are recomputed from title and description.
+    With `missing_only`, tasks that already have them are skipped.
+    """
+    db = get_db()
+
+    query = {"title_terms": {"$exists": False}} if missing_only else {}
+    ops = []
+    updated = 0
+    for task in db.tasks.find(query, {"title": 1, "description": 1}):
+        ops.append(
+            UpdateOne(
+                {"_id": task["_id"]},
+                {"$set": search_fields(task.get("title"), task.get("description"))},
+            )
+        )
+        if len(ops) >= BATCH_SIZE:
+            updated += db.tasks.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.tasks.bulk_write(ops, ordered=False).modified_count
+
+    print(f"Updated search terms on {updated} tasks.")
+
+
+if __name__ == "__main__":
+    run()
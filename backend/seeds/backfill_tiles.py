@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from pymongo import UpdateOne
+
+from backend.utils.db import get_db
+from backend.utils.spatial import tile_fields
+
+
+BATCH_SIZE = 1000
+
+
+def run() -> None:
+    """
+    Add tile_x/tile_y to celestial objects written before viewport queries
+    existed, so they show up in bbox lookups.
+    """
+    db = get_db()
+
+    cursor = db.celestial_objects.find(
+        {"tile_x": {"$exists": False}}, {"x": 1, "y": 1}
+    )
+    ops = []
+    total = 0
+    for doc in cursor:
+        x = float(doc.get("x", 0) or 0)
+        y = float(doc.get("y", 0) or 0)
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": tile_fields(x, y)}))
+        if len(ops) >= BATCH_SIZE:
+            total += db.celestial_objects.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        total += db.celestial_objects.bulk_write(ops, ordered=False).modified_count
+
+    print(f"Backfilled tiles for {total} celestial objects.")
+
+
+if __name__ == "__main__":
+    run()
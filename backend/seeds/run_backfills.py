@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.seeds import backfill_daily_stats, backfill_heatmap, backfill_task_search, backfill_tiles
+from backend.utils.db import get_db
+
+
+# Marker in the `migrations` collection for the startup run.
+MARKER_ID = "backfills"
+
+# A claim older than this is taken over, e.g. when a serverless instance
+# was frozen mid-run. Every step only fills what is missing, so a rerun
+# is harmless.
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+def run() -> None:
+    """
+    Rebuild all derived data, in order: daily rollups, star tiles, focus
+    heatmaps, task search terms.
+    """
+    backfill_daily_stats.run()
+    backfill_tiles.run()
+    backfill_heatmap.run()
+    backfill_task_search.run()
+
+
+def run_pending() -> None:
+    """
+    Fill derived data that existing users lack, once per database.
+
+    Called at startup; the first instance claims the marker and the rest
+    return after one read. Rollups are only built for users that have
+    none yet, so nothing recorded live is overwritten.
+    """
+    db = get_db()
+    if db.migrations.find_one({"_id": MARKER_ID, "done_at": {"$exists": True}}, {"_id": 1}):
+        return
+
+    now = datetime.utcnow()
+    try:
+        db.migrations.update_one(
+            {"_id": MARKER_ID, "done_at": {"$exists": False}, "claimed_at": {"$lt": now - CLAIM_TIMEOUT}},
+            {"$set": {"claimed_at": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # Done, or being run by another instance.
+        return
+
+    backfill_daily_stats.run(missing_only=True)
+    backfill_tiles.run()
+    backfill_heatmap.run(missing_only=True)
+    backfill_task_search.run(missing_only=True)
+    db.migrations.update_one({"_id": MARKER_ID}, {"$set": {"done_at": datetime.utcnow()}})
+
+
+def _run_pending_quietly() -> None:
+    try:
+        run_pending()
+    except Exception as exc:
+        print(f"⚠️  Warning: Backfills did not finish: {exc}")
+
+
+def start_pending_thread() -> None:
+    threading.Thread(target=_run_pending_quietly, daemon=True).start()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+GRANULARITIES = ("day", "week", "month")
+GROUP_BYS = ("mood", "category")
+
+# Longest range /stats/range accepts, in days.
+MAX_RANGE_DAYS = 3 * 366
+
+UNCATEGORIZED = "Uncategorized"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_seconds(value: datetime) -> float:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+
+def bucket_starts(start: date, end: date, granularity: str) -> List[date]:
+    """
+    First day of every bucket overlapping start..end (inclusive). Weeks
+    start on Monday; the first bucket is clipped to `start`.
+    """
+    if granularity == "week":
+        first = start - timedelta(days=start.weekday())
+    elif granularity == "month":
+        first = start.replace(day=1)
+    else:
+        first = start
+
+    starts: List[date] = []
+    current = first
+    while current <= end:
+        starts.append(max(current, start))
+        if granularity == "week":
+            current += timedelta(days=7)
+        elif granularity == "month":
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=1)
+    return starts
+
+
+def bucket_minutes(
+    started_at: Sequence[datetime],
+    minutes: Sequence[float],
+    groups: Sequence[str] | None,
+    starts: Sequence[date],
+) -> Dict[str, List[float]]:
+    """
+    Sum `minutes` into the buckets beginning at `starts`, one dense series
+    per group (or a single "total" series when `groups` is None).
+
+    Timestamps are located with one searchsorted over the bucket edges and
+    summed with one bincount over (group, bucket) cells.
+    """
+    n_buckets = len(starts)
+    edges = [_epoch_seconds(datetime(d.year, d.month, d.day)) for d in starts]
+    labels = list(groups) if groups is not None else ["total"] * len(minutes)
+    names = sorted(set(labels)) or ["total"]
+    if not minutes:
+        return {name: [0.0] * n_buckets for name in names}
+
+    if np is not None:
+        times = np.fromiter((_epoch_seconds(t) for t in started_at), dtype=np.float64, count=len(started_at))
+        bucket = np.searchsorted(np.asarray(edges), times, side="right") - 1
+        code_of = {name: i for i, name in enumerate(names)}
+        codes = np.fromiter((code_of[g] for g in labels), dtype=np.int64, count=len(labels))
+        keep = bucket >= 0
+        cells = np.bincount(
+            codes[keep] * n_buckets + bucket[keep],
+            weights=np.asarray(minutes, dtype=np.float64)[keep],
+            minlength=len(names) * n_buckets,
+        ).reshape(len(names), n_buckets)
+        return {name: cells[i].tolist() for i, name in enumerate(names)}
+
+    series = {name: [0.0] * n_buckets for name in names}
+    for t, m, g in zip(started_at, minutes, labels):
+        idx = bisect_right(edges, _epoch_seconds(t)) - 1
+        if idx >= 0:
+            series[g][idx] += m
+    return series
+
+
+def load_session_columns(db, user_id: str, query: Dict[str, Any], group_by: str | None):
+    """
+    Fetch only the columns range analytics need and return them as
+    parallel lists: (started_at, minutes, groups or None).
+    """
+    fields = {"_id": 0, "started_at": 1, "duration_minutes": 1}
+    if group_by == "mood":
+        fields["mood"] = 1
+    elif group_by == "category":
+        fields["task_id"] = 1
+
+    started_at: List[datetime] = []
+    minutes: List[float] = []
+    raw_groups: List[Any] = []
+    for doc in db.sessions.find(query, fields):
+        if doc.get("started_at") is None:
+            continue
+        started_at.append(doc["started_at"])
+        minutes.append(float(doc.get("duration_minutes", 0) or 0))
+        if group_by == "mood":
+            raw_groups.append(doc.get("mood") or "neutral")
+        elif group_by == "category":
+            raw_groups.append(doc.get("task_id"))
+
+    if group_by is None:
+        return started_at, minutes, None
+    if group_by == "mood":
+        return started_at, minutes, raw_groups
+
+    task_ids = list({t for t in raw_groups if t is not None})
+    category_of = {
+        t["_id"]: t.get("category") or UNCATEGORIZED
+        for t in db.tasks.find({"_id": {"$in": task_ids}, "user_id": user_id}, {"category": 1})
+    } if task_ids else {}
+    return started_at, minutes, [category_of.get(t, UNCATEGORIZED) for t in raw_groups]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import math
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+Point = Sequence[float]
+
+
+def min_movement_assignment(targets: Sequence[Point], sources: Sequence[Point]) -> List[int]:
+    """
+    Assign each target point to a distinct source point so the summed
+    Euclidean distance is minimal (Hungarian algorithm, shortest
+    augmenting path form).
+
+    Requires len(targets) <= len(sources). Returns, for each target, the
+    index of the source assigned to it. Uses NumPy when available; the
+    pure-Python path gives the same answer, just slower.
+    """
+    if len(targets) > len(sources):
+        raise ValueError("need at least as many sources as targets")
+    if not targets:
+        return []
+    if np is not None:
+        return _assign_numpy(targets, sources)
+    return _assign_python(targets, sources)
+
+
+def _assign_numpy(targets: Sequence[Point], sources: Sequence[Point]) -> List[int]:
+    t = np.asarray(targets, dtype=np.float64)
+    s = np.asarray(sources, dtype=np.float64)
+    cost = np.hypot(t[:, None, 0] - s[None, :, 0], t[:, None, 1] - s[None, :, 1])
+
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    # p[j]: row (1-based) matched to column j; column 0 is the virtual root.
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    result = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            result[p[j] - 1] = j - 1
+    return result
+
+
+def _assign_python(targets: Sequence[Point], sources: Sequence[Point]) -> List[int]:
+    cost = [[math.hypot(tx - sx, ty - sy) for sx, sy in sources] for tx, ty in targets]
+
+    n, m = len(cost), len(sources)
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = row[j - 1] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    result = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            result[p[j] - 1] = j - 1
+    return result
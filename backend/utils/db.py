@@ -1,11 +1,14 @@
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
 from dotenv import load_dotenv
 from pymongo import MongoClient
 from pymongo.database import Database
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 
+from .galaxy_sync import TOMBSTONE_TTL_SECONDS
+from .history import ensure_history_collection
+
 
 load_dotenv()
 
@@ -82,13 +85,75 @@ def get_default_user_id() -> str:
     return "demo-user"
 
 
-def ensure_indexes() -> None:
+# Every index the app relies on, as (collection, keys, options). The
+# query plan audit (backend/seeds/audit_query_plans.py) checks the routes'
+# query shapes against exactly this set.
+INDEXES: List[Tuple[str, List[Tuple[str, int]], Dict[str, Any]]] = [
+    ("tasks", [("user_id", 1), ("date", 1)], {}),
+    # list_tasks: equality on user (and category), then the display sort;
+    # `completed` trails so that filter is applied inside the index scan.
+    (
+        "tasks",
+        [("user_id", 1), ("date", -1), ("due_at", 1), ("created_at", -1), ("_id", -1), ("completed", 1)],
+        {},
+    ),
+    (
+        "tasks",
+        [
+            ("user_id", 1),
+            ("category", 1),
+            ("date", -1),
+            ("due_at", 1),
+            ("created_at", -1),
+            ("_id", -1),
+            ("completed", 1),
+        ],
+        {},
+    ),
+    # /tasks/search: multikey index over every word prefix, then the
+    # candidate order so the capped candidate set comes off the index.
+    ("tasks", [("user_id", 1), ("search_terms", 1), ("created_at", -1), ("_id", -1)], {}),
+    # Recurring series, found by user and end date for every listing window.
+    (
+        "tasks",
+        [("user_id", 1), ("recurrence.until", 1)],
+        {"partialFilterExpression": {"recurrence": {"$exists": True}}},
+    ),
+    ("sessions", [("user_id", 1), ("started_at", 1)], {}),
+    ("sessions", [("user_id", 1), ("created_at", 1)], {}),
+    ("calendar_events", [("user_id", 1), ("date", 1), ("time", 1)], {}),
+    (
+        "calendar_events",
+        [("user_id", 1), ("recurrence.until", 1)],
+        {"partialFilterExpression": {"recurrence": {"$exists": True}}},
+    ),
+    ("moods", [("order", 1)], {}),
+    ("moods", [("key", 1)], {}),
+    ("celestial_objects", [("user_id", 1), ("created_at", 1)], {}),
+    ("celestial_objects", [("user_id", 1), ("rev", 1)], {}),
+    ("celestial_objects", [("user_id", 1), ("tile_x", 1), ("tile_y", 1)], {}),
+    ("galaxy_layout", [("user_id", 1), ("created_at", 1)], {}),
+    ("galaxy_revisions", [("user_id", 1)], {"unique": True}),
+    ("galaxy_tombstones", [("user_id", 1), ("rev", 1)], {}),
+    ("galaxy_tombstones", [("deleted_at", 1)], {"expireAfterSeconds": TOMBSTONE_TTL_SECONDS}),
+    ("reset_jobs", [("user_id", 1), ("status", 1)], {}),
+    ("daily_stats", [("user_id", 1), ("day", 1)], {"unique": True}),
+    ("streaks", [("user_id", 1)], {"unique": True}),
+    ("data_versions", [("user_id", 1)], {"unique": True}),
+    ("focus_heatmap", [("user_id", 1)], {"unique": True}),
+]
+
+
+def ensure_indexes(db: Database | None = None) -> None:
     """
     Create useful indexes. This is idempotent and safe to call at startup.
     """
-    db = get_db()
-    db.tasks.create_index([("user_id", 1), ("date", 1)])
-    db.sessions.create_index([("user_id", 1), ("started_at", 1)])
-    db.celestial_objects.create_index([("user_id", 1), ("created_at", 1)])
+    if db is None:
+        db = get_db()
+    # First: any create_index (or write) on galaxy_history would create it
+    # as a normal collection, and it could never become capped afterwards.
+    ensure_history_collection(db)
+    for collection, keys, options in INDEXES:
+        db[collection].create_index(keys, **options)
 
 
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence
+
+from flask import request
+
+
+Serializer = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class FieldSet:
+    """
+    Sparse fieldsets for one resource: maps each field a serializer emits
+    to the document fields it is built from, so `?fields=` can become
+    both a MongoDB projection and a trimmed response. `id` is always
+    returned.
+    """
+
+    def __init__(self, sources: Mapping[str, Sequence[str]]):
+        self.sources = dict(sources)
+
+    def requested(self) -> List[str] | None:
+        """
+        Fields named by `?fields=a,b,c` on the current request, or None
+        for all of them. Raises ValueError on unknown names.
+        """
+        raw = request.args.get("fields")
+        if not raw:
+            return None
+        names = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.sources]
+        if unknown:
+            raise ValueError(
+                f"Unknown field(s): {', '.join(unknown)}; "
+                f"allowed: {', '.join(sorted(self.sources))}"
+            )
+        return ["id"] + [name for name in names if name != "id"]
+
+    def projection(
+        self, fields: List[str] | None, also: Iterable[str] = ()
+    ) -> Dict[str, int] | None:
+        """
+        Projection fetching just what `fields` need, plus `also` (fields
+        the route itself reads, e.g. sort keys for cursors). None when
+        every field is wanted.
+        """
+        if fields is None:
+            return None
+        projection = {"_id": 1}
+        for name in fields:
+            for source in self.sources[name]:
+                projection[source] = 1
+        for source in also:
+            projection[source] = 1
+        return projection
+
+    def serializer(self, serialize: Serializer, fields: List[str] | None) -> Serializer:
+        if fields is None:
+            return serialize
+        wanted = set(fields)
+        return lambda doc: {k: v for k, v in serialize(doc).items() if k in wanted}
+
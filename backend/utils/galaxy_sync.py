@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+# How long a write may take between allocating its revision and landing
+# in MongoDB. Delta cursors stay behind revisions younger than this.
+REVISION_SETTLE_SECONDS = 10
+
+# Allocation times kept on the counter document, oldest first; entry -1
+# belongs to `rev`, entry -2 to `rev - 1` and so on.
+RECENT_REVISIONS = 64
+
+# Tombstones expire (TTL index on deleted_at) after this many days. Each
+# user's counter document keeps the highest tombstone revision per day
+# (`tombstone_days`), folded into `tombstone_floor` once the day is old
+# enough; cursors below the floor may have lost tombstones and get a
+# full response instead.
+TOMBSTONE_TTL_DAYS = 30
+TOMBSTONE_TTL_SECONDS = TOMBSTONE_TTL_DAYS * 24 * 3600
+
+
+def _stamp_allocation() -> Dict[str, Any]:
+    return {"rev_times": {"$each": [datetime.utcnow()], "$slice": -RECENT_REVISIONS}}
+
+
+def next_revision(db, user_id: str) -> int:
+    """
+    Atomically allocate the next galaxy revision for a user.
+
+    Every write to a user's celestial objects stamps the touched documents
+    with the revision it allocated, so `/api/galaxy/data?since=<cursor>`
+    can return only what changed after a given revision.
+    """
+    doc = db.galaxy_revisions.find_one_and_update(
+        {"user_id": user_id},
+        {"$inc": {"rev": 1}, "$push": _stamp_allocation()},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc["rev"])
+
+
+def next_star_slot(db, user_id: str, count: int = 1) -> tuple[int, int]:
+    """
+    Atomically allocate (spiral index, revision) for a new star. With
+    `count`, reserve that many consecutive indices (sharing one revision)
+    and return the first.
+
+    The spiral index lives on the same counter document as the revision,
+    so one find_one_and_update replaces counting the user's stars and two
+    concurrent sessions can never get the same index. Users whose counter
+    predates the index are seeded once from their current star count.
+    """
+    while True:
+        doc = db.galaxy_revisions.find_one_and_update(
+            {"user_id": user_id, "star_index": {"$exists": True}},
+            {"$inc": {"rev": 1, "star_index": count}, "$push": _stamp_allocation()},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None:
+            return int(doc["star_index"]) - count + 1, int(doc["rev"])
+
+        existing = db.celestial_objects.count_documents({"user_id": user_id})
+        try:
+            db.galaxy_revisions.update_one(
+                {"user_id": user_id, "star_index": {"$exists": False}},
+                {"$set": {"star_index": existing}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # Another request seeded the counter first; just retry the $inc.
+            pass
+
+
+def get_revision_state(db, user_id: str) -> Dict[str, Any]:
+    """
+    Return the user's revision counter document (empty for new users).
+    """
+    return db.galaxy_revisions.find_one({"user_id": user_id}) or {}
+
+
+def settled_revision(state: Dict[str, Any], now: datetime | None = None, since: int = 0) -> int:
+    """
+    Highest revision a delta cursor may claim for a counter document.
+
+    Writers allocate a revision before they insert or update, so a reader
+    can see the counter ahead of objects that have not landed yet.
+    Revisions allocated in the last REVISION_SETTLE_SECONDS are treated
+    as in flight and the cursor stops just before the oldest of them;
+    the next delta then re-sends that short overlap, which clients apply
+    idempotently. Nothing before the last reset is waited for.
+
+    Never returns 0, which clients send back to ask for everything: when
+    nothing has settled yet the previous cursor `since` (or 1) is kept.
+    """
+    rev = int(state.get("rev", 0))
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=REVISION_SETTLE_SECONDS)
+    settled = rev
+    for age, allocated_at in enumerate(reversed(state.get("rev_times") or [])):
+        if allocated_at > cutoff:
+            settled = min(settled, rev - age - 1)
+    settled = max(settled, int(state.get("reset_rev", 0)))
+    return settled or (since if since <= rev else 0) or 1
+
+
+def _expired_day(now: datetime) -> str:
+    # Tombstones from this day or earlier may already be gone.
+    return (now - timedelta(days=TOMBSTONE_TTL_DAYS)).strftime("%Y-%m-%d")
+
+
+def tombstone_floor(state: Dict[str, Any], now: datetime | None = None) -> int:
+    """
+    Lowest delta cursor whose tombstones are all still stored.
+    """
+    expired = _expired_day(now or datetime.utcnow())
+    days = state.get("tombstone_days") or {}
+    return max(
+        [int(state.get("tombstone_floor", 0))]
+        + [int(rev) for day, rev in days.items() if day <= expired]
+    )
+
+
+def record_tombstones(db, user_id: str, object_ids: Iterable[Any], rev: int) -> None:
+    """
+    Remember deleted celestial objects so delta clients can drop them.
+    """
+    now = datetime.utcnow()
+    docs = [
+        {"user_id": user_id, "object_id": str(oid), "rev": rev, "deleted_at": now}
+        for oid in object_ids
+    ]
+    if not docs:
+        return
+    db.galaxy_tombstones.insert_many(docs)
+
+    state = db.galaxy_revisions.find_one_and_update(
+        {"user_id": user_id},
+        {"$max": {f"tombstone_days.{now.strftime('%Y-%m-%d')}": rev}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    # Fold days past the TTL into the floor so the map stays small.
+    expired = _expired_day(now)
+    old = [day for day in state.get("tombstone_days") or {} if day <= expired]
+    if old:
+        db.galaxy_revisions.update_one(
+            {"user_id": user_id},
+            {
+                "$max": {"tombstone_floor": tombstone_floor(state, now)},
+                "$unset": {f"tombstone_days.{day}": "" for day in old},
+            },
+        )
+
+
+def mark_reset(db, user_id: str) -> int:
+    """
+    Record that the whole galaxy was wiped.
+
+    A single reset marker replaces per-object tombstones: any cursor older
+    than it gets a full (replace) response instead of a delta. The old
+    tombstones are left to the reset job.
+    """
+    rev = next_revision(db, user_id)
+    db.galaxy_revisions.update_one(
+        {"user_id": user_id},
+        {"$set": {"reset_rev": rev, "star_index": 0}, "$unset": {"tombstone_days": ""}},
+    )
+    return rev
+
+
+def parse_cursor(raw: str | None) -> int | None:
+    """
+    Decode a `since` cursor. Returns None when it is malformed.
+    """
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import CollectionInvalid
+
+from .galaxy_sync import next_revision, record_tombstones
+from .layout import write_positions
+
+
+# Size bound of the capped galaxy_history collection; the oldest
+# operations fall off once it is full.
+HISTORY_CAP_BYTES = 64 * 1024 * 1024
+
+# Set once this process has made sure galaxy_history exists (capped).
+_history_ready = False
+
+
+def ensure_history_collection(db) -> None:
+    """
+    Create the capped history collection if it does not exist yet.
+    """
+    global _history_ready
+    if "galaxy_history" not in db.list_collection_names():
+        try:
+            db.create_collection("galaxy_history", capped=True, size=HISTORY_CAP_BYTES)
+        except CollectionInvalid:
+            # Created concurrently by another instance.
+            pass
+    _history_ready = True
+
+
+def record_layout_op(
+    db,
+    user_id: str,
+    op: str,
+    changes: List[Dict[str, Any]],
+    created_ids: List[Any] | None = None,
+) -> str | None:
+    """
+    Store the change-set of a layout operation so it can be undone.
+
+    Only touched stars are kept, as parallel arrays of ids and previous
+    positions, plus the ids of stars the operation created. Returns the
+    op id, or None when the operation changed nothing.
+    """
+    created_ids = [ObjectId(i) for i in (created_ids or [])]
+    if not changes and not created_ids:
+        return None
+
+    doc = {
+        "user_id": user_id,
+        "op": op,
+        "ids": [c["_id"] for c in changes],
+        "prev_x": [float(c.get("prev_x") or 0) for c in changes],
+        "prev_y": [float(c.get("prev_y") or 0) for c in changes],
+        "created": created_ids,
+        "undone": False,
+        "created_at": datetime.utcnow(),
+    }
+    if not _history_ready:
+        # Startup may have failed before creating it; an insert would
+        # otherwise create an uncapped collection.
+        ensure_history_collection(db)
+    return str(db.galaxy_history.insert_one(doc).inserted_id)
+
+
+def undo_layout_op(db, user_id: str, op_id: ObjectId) -> Dict[str, Any] | None:
+    """
+    Revert one recorded operation: moved stars go back in one bulk write,
+    created stars are deleted. Returns None if the op is unknown or was
+    already undone.
+    """
+    entry = db.galaxy_history.find_one_and_update(
+        {"_id": op_id, "user_id": user_id, "undone": False},
+        {"$set": {"undone": True}},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if entry is None:
+        return None
+
+    rev = next_revision(db, user_id)
+    changes = [
+        {"_id": oid, "x": x, "y": y}
+        for oid, x, y in zip(entry["ids"], entry["prev_x"], entry["prev_y"])
+    ]
+    write_positions(db, user_id, changes, rev=rev)
+
+    deleted = 0
+    created = entry.get("created") or []
+    if created:
+        deleted = db.celestial_objects.delete_many(
+            {"_id": {"$in": created}, "user_id": user_id}
+        ).deleted_count
+        record_tombstones(db, user_id, created, rev)
+
+    return {"op": entry["op"], "reverted": len(changes), "deleted": deleted}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from .galaxy_sync import next_revision
+from .spatial import tile_fields
+
+
+def parse_positions(items: Iterable[Dict[str, Any]]) -> Dict[ObjectId, tuple[float, float]]:
+    """
+    Turn [{id, x, y}, ...] into {ObjectId: (x, y)}, skipping bad entries.
+    Later entries for the same id win.
+    """
+    positions: Dict[ObjectId, tuple[float, float]] = {}
+    for item in items:
+        if not isinstance(item, dict) or not item.get("id"):
+            continue
+        try:
+            oid = ObjectId(item["id"])
+            x = float(item.get("x", 0) or 0)
+            y = float(item.get("y", 0) or 0)
+        except Exception:
+            continue
+        positions[oid] = (x, y)
+    return positions
+
+
+def commit_layout(
+    db,
+    user_id: str,
+    positions: Dict[ObjectId, tuple[float, float]],
+    rev: int | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Write star positions in a single ordered bulk_write.
+
+    Current positions are read once so stars that did not move (or do not
+    belong to the user) are skipped. Returns one entry per moved star:
+    { _id, x, y, prev_x, prev_y }.
+    """
+    if not positions:
+        return []
+
+    current = db.celestial_objects.find(
+        {"_id": {"$in": list(positions)}, "user_id": user_id},
+        {"x": 1, "y": 1},
+    )
+
+    changes = []
+    for doc in current:
+        x, y = positions[doc["_id"]]
+        prev_x, prev_y = doc.get("x"), doc.get("y")
+        if prev_x == x and prev_y == y:
+            continue
+        changes.append({"_id": doc["_id"], "x": x, "y": y, "prev_x": prev_x, "prev_y": prev_y})
+
+    return write_positions(db, user_id, changes, rev=rev)
+
+
+def write_positions(
+    db,
+    user_id: str,
+    changes: List[Dict[str, Any]],
+    rev: int | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Apply already-diffed position changes ({_id, x, y, ...}) in one ordered
+    bulk_write, stamping them with a sync revision.
+    """
+    if not changes:
+        return []
+
+    if rev is None:
+        rev = next_revision(db, user_id)
+
+    db.celestial_objects.bulk_write(
+        [
+            UpdateOne(
+                {"_id": c["_id"], "user_id": user_id},
+                {"$set": {"x": c["x"], "y": c["y"], **tile_fields(c["x"], c["y"]), "rev": rev}},
+            )
+            for c in changes
+        ],
+        ordered=True,
+    )
+    return changes
+
+
+def serialize_changes(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{"id": str(c["_id"]), "x": c["x"], "y": c["y"]} for c in changes]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+from bson import ObjectId
+
+
+# Values a cursor may carry; anything else (e.g. a dict smuggling query
+# operators) is rejected.
+_CURSOR_TYPES = (str, int, float, bool, ObjectId, datetime, type(None))
+
+# Page size bounds for `?limit=`.
+MAX_PAGE_SIZE = 200
+
+Sort = Sequence[Tuple[str, int]]
+
+
+def parse_limit(raw: str | None, default: int | None = None) -> int | None:
+    """
+    Page size from `?limit=`, clamped to 1..MAX_PAGE_SIZE. Raises
+    ValueError on garbage.
+    """
+    if raw in (None, ""):
+        return default
+    return max(1, min(int(raw), MAX_PAGE_SIZE))
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(doc: Dict[str, Any], sort: Sort) -> str:
+    """
+    Opaque cursor pointing just past `doc` in `sort` order.
+    """
+    values = [_encode_value(doc.get(field)) for field, _ in sort]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Sort) -> List[Any]:
+    """
+    Sort-key values stored in a cursor. Raises ValueError if it was not
+    produced by encode_cursor for the same sort, including when a value is
+    not a plain scalar, id or date: keyset_filter puts them into queries.
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values = [_decode_value(v) for v in raw] if isinstance(raw, list) else None
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if values is None or len(values) != len(sort):
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, _CURSOR_TYPES) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> Dict[str, Any] | None:
+    """
+    Condition for `field` sorting strictly after `value`. MongoDB orders
+    null/missing before any string, date or id, which matters both ways.
+    """
+    if direction < 0:
+        # Descending: smaller values, then nulls last.
+        if value is None:
+            return None
+        return {"$or": [{field: {"$lt": value}}, {field: None}]}
+    if value is None:
+        return {field: {"$ne": None}}
+    return {field: {"$gt": value}}
+
+
+def keyset_filter(sort: Sort, values: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Query matching the documents after the row with sort-key `values`:
+    the usual (a > x) or (a = x and b > y) or ... expansion, honouring
+    the direction of each key. `sort` must end with a unique field.
+    """
+    branches: List[Dict[str, Any]] = []
+    for i, (field, direction) in enumerate(sort):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        equal = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        branches.append({"$and": [equal, after]} if equal else after)
+    if not branches:
+        return {"_id": {"$exists": False}}
+    return {"$or": branches}
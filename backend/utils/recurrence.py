@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import calendar
+import json
+import os
+from datetime import date, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterator, Tuple
+
+from .stats_cache import LRUCache
+
+
+FREQS = ("daily", "weekly", "monthly")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Bounds on stored rules and on one expansion.
+MAX_INTERVAL = 366
+MAX_COUNT = 1000
+MAX_WINDOW_DAYS = 366
+
+# Expanded windows kept in process. An expansion depends only on the
+# anchor date, the rule and the window, so entries never go stale.
+RECURRENCE_CACHE_SIZE = int(os.getenv("RECURRENCE_CACHE_SIZE", "512"))
+
+_expansions = LRUCache(max_entries=RECURRENCE_CACHE_SIZE, ttl=float("inf"))
+
+
+def parse_day(value: Any) -> date:
+    """
+    Date of a stored YYYY-MM-DD string (a longer ISO timestamp is cut to
+    its date). Raises ValueError.
+    """
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid date: {value!r}") from exc
+
+
+def _weekday(value: Any) -> int:
+    if isinstance(value, str) and value.upper()[:2] in WEEKDAYS:
+        return WEEKDAYS.index(value.upper()[:2])
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 6:
+        return value
+    raise ValueError(f"Invalid weekday: {value!r}")
+
+
+def parse_rule(raw: Any) -> Dict[str, Any] | None:
+    """
+    Normalized recurrence rule from a request body, or None for no
+    recurrence. Accepts
+        { freq: daily|weekly|monthly, interval?, byweekday?, until? | count?,
+          exdates? }
+    where byweekday (weekly only) holds 0-6 (Monday first) or MO..SU and
+    exdates are YYYY-MM-DD occurrences to skip. Raises ValueError.
+    """
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("recurrence must be an object")
+
+    freq = str(raw.get("freq", "")).lower()
+    if freq not in FREQS:
+        raise ValueError(f"recurrence.freq must be one of: {', '.join(FREQS)}")
+    try:
+        interval = int(raw.get("interval") or 1)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("recurrence.interval must be a number") from exc
+    if not 1 <= interval <= MAX_INTERVAL:
+        raise ValueError(f"recurrence.interval must be 1..{MAX_INTERVAL}")
+
+    rule: Dict[str, Any] = {"freq": freq, "interval": interval}
+
+    if raw.get("byweekday"):
+        if freq != "weekly":
+            raise ValueError("recurrence.byweekday only applies to weekly rules")
+        if not isinstance(raw["byweekday"], list):
+            raise ValueError("recurrence.byweekday must be a list")
+        rule["byweekday"] = sorted({_weekday(d) for d in raw["byweekday"]})
+
+    if raw.get("until") and raw.get("count"):
+        raise ValueError("recurrence takes until or count, not both")
+    if raw.get("until"):
+        rule["until"] = parse_day(raw["until"]).isoformat()
+    if raw.get("count"):
+        try:
+            count = int(raw["count"])
+        except (TypeError, ValueError) as exc:
+            raise ValueError("recurrence.count must be a number") from exc
+        if not 1 <= count <= MAX_COUNT:
+            raise ValueError(f"recurrence.count must be 1..{MAX_COUNT}")
+        rule["count"] = count
+
+    exdates = raw.get("exdates") or []
+    if not isinstance(exdates, list):
+        raise ValueError("recurrence.exdates must be a list")
+    if exdates:
+        rule["exdates"] = sorted({parse_day(d).isoformat() for d in exdates})
+    return rule
+
+
+def series_rule(raw: Any, anchor: Any) -> Dict[str, Any] | None:
+    """
+    parse_rule for a task or event starting on `anchor` (its `date`),
+    which a series needs. Raises ValueError.
+    """
+    rule = parse_rule(raw)
+    if rule:
+        try:
+            parse_day(anchor)
+        except ValueError as exc:
+            raise ValueError("A recurring item needs a date (YYYY-MM-DD)") from exc
+    return rule
+
+
+def parse_window(raw_from: str | None, raw_to: str | None) -> Tuple[date, date] | None:
+    """
+    Listing window from `?from=&to=` (inclusive YYYY-MM-DD dates), or
+    None when neither is given. Raises ValueError.
+    """
+    if not raw_from and not raw_to:
+        return None
+    if not raw_from or not raw_to:
+        raise ValueError("from and to must be given together")
+    start, end = parse_day(raw_from), parse_day(raw_to)
+    if end < start:
+        raise ValueError("to must not be before from")
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"Window is limited to {MAX_WINDOW_DAYS} days")
+    return start, end
+
+
+def month_window(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _candidates(anchor: date, rule: Dict[str, Any], since: date, last: date) -> Iterator[date]:
+    """
+    Dates the rule generates from `since` to `last`, in order, ignoring
+    until/count/exdates. Starts at the period containing `since` rather
+    than at the anchor, so the cost follows the window, not the series.
+    """
+    interval = rule["interval"]
+    since = max(since, anchor)
+
+    if rule["freq"] == "daily":
+        skip = -(-(since - anchor).days // interval)
+        current = anchor + timedelta(days=skip * interval)
+        while current <= last:
+            yield current
+            current += timedelta(days=interval)
+        return
+
+    if rule["freq"] == "weekly":
+        days = rule.get("byweekday") or [anchor.weekday()]
+        first_week = anchor - timedelta(days=anchor.weekday())
+        period = (since - first_week).days // 7 // interval
+        while True:
+            week = first_week + timedelta(weeks=period * interval)
+            if week > last:
+                return
+            for day in days:
+                current = week + timedelta(days=day)
+                if since <= current <= last:
+                    yield current
+            period += 1
+
+    # Monthly on the anchor's day of month; months too short for it are
+    # skipped, as RFC 5545 does.
+    first_month = anchor.year * 12 + anchor.month - 1
+    period = (since.year * 12 + since.month - 1 - first_month) // interval
+    while True:
+        year, month = divmod(first_month + period * interval, 12)
+        month += 1
+        if date(year, month, 1) > last:
+            return
+        if anchor.day <= calendar.monthrange(year, month)[1]:
+            current = date(year, month, anchor.day)
+            if since <= current <= last:
+                yield current
+        period += 1
+
+
+def expand(anchor: date, rule: Dict[str, Any], start: date, end: date) -> Tuple[str, ...]:
+    """
+    YYYY-MM-DD occurrences of a series anchored at `anchor` that fall in
+    start..end (inclusive), honouring until, count and exdates. Results
+    are cached per (anchor, rule, window).
+    """
+    key = json.dumps([anchor.isoformat(), rule, start.isoformat(), end.isoformat()], sort_keys=True)
+    cached = _expansions.get(key)
+    if cached is not None:
+        return cached
+
+    last = end
+    if rule.get("until"):
+        last = min(last, parse_day(rule["until"]))
+    if rule.get("count"):
+        # Count includes skipped dates (RFC 5545), so it ends the series at
+        # the count-th generated date; at most MAX_COUNT steps.
+        head = list(islice(_candidates(anchor, rule, anchor, last), rule["count"]))
+        if len(head) == rule["count"]:
+            last = head[-1]
+
+    skip = set(rule.get("exdates", ()))
+    result = tuple(
+        d.isoformat() for d in _candidates(anchor, rule, start, last) if d.isoformat() not in skip
+    )
+    _expansions.set(key, result)
+    return result
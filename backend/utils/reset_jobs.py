@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+
+from .db import get_db
+from .rollups import clear_focus, day_key
+
+
+# Collections wiped by a galaxy reset, in the order they are processed.
+RESET_COLLECTIONS = ("celestial_objects", "galaxy_layout", "sessions", "galaxy_tombstones")
+
+# Timestamp compared against the reset time; created_at unless listed.
+RESET_TIME_FIELDS = {"galaxy_tombstones": "deleted_at"}
+
+# After the deletes, focus numbers are cleared from the daily rollups of
+# days before the reset (the reset day itself is cleared by the request).
+RESET_STAGES = RESET_COLLECTIONS + ("daily_stats",)
+
+# Documents removed per delete_many; keeps each step well inside a
+# serverless request and frees the pooled connection in between.
+RESET_BATCH_SIZE = 500
+
+
+def visible_filter(
+    db,
+    user_id: str,
+    field: str = "created_at",
+    state: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """
+    Base query for a user's galaxy data that hides documents awaiting
+    deletion by a reset job.
+
+    While a job runs, the user's counter document carries `hidden_before`
+    (the reset time); anything not newer than it is treated as gone. Pass
+    `state` when the counter document has already been read.
+    """
+    query: Dict[str, Any] = {"user_id": user_id}
+    if state is None:
+        state = db.galaxy_revisions.find_one({"user_id": user_id}, {"hidden_before": 1}) or {}
+    hidden_before = state.get("hidden_before")
+    if hidden_before is not None:
+        query[field] = {"$gt": hidden_before}
+    return query
+
+
+def start_reset_job(db, user_id: str) -> Dict[str, Any]:
+    """
+    Hide the user's current galaxy and queue its deletion.
+
+    Returns the job document; call advance_reset_job (or run_reset_job in
+    a thread) to do the actual work.
+    """
+    cutoff = datetime.utcnow()
+    db.galaxy_revisions.update_one(
+        {"user_id": user_id}, {"$set": {"hidden_before": cutoff}}, upsert=True
+    )
+    job = {
+        "user_id": user_id,
+        "cutoff": cutoff,
+        "status": "running",
+        "stage": 0,
+        "deleted": {name: 0 for name in RESET_COLLECTIONS},
+        "cleared_days": 0,
+        "created_at": cutoff,
+        "updated_at": cutoff,
+    }
+    job["_id"] = db.reset_jobs.insert_one(job).inserted_id
+    return job
+
+
+def advance_reset_job(db, job_id: ObjectId) -> Dict[str, Any] | None:
+    """
+    Run one bounded step of a reset job and return its updated state.
+
+    Safe to call from several places at once: deletes are idempotent and
+    stage changes are conditional on the stage they started from.
+    """
+    job = db.reset_jobs.find_one({"_id": job_id})
+    if job is None or job["status"] == "done":
+        return job
+
+    stage = job["stage"]
+    if stage >= len(RESET_STAGES):
+        return _finish_reset_job(db, job)
+
+    now = datetime.utcnow()
+    if RESET_STAGES[stage] == "daily_stats":
+        done = clear_focus(db, job["user_id"], day_key(job["cutoff"]), RESET_BATCH_SIZE)
+        progress = {"cleared_days": done}
+    else:
+        name = RESET_STAGES[stage]
+        field = RESET_TIME_FIELDS.get(name, "created_at")
+        doomed = {"user_id": job["user_id"], field: {"$not": {"$gt": job["cutoff"]}}}
+        ids = [d["_id"] for d in db[name].find(doomed, {"_id": 1}).limit(RESET_BATCH_SIZE)]
+        done = db[name].delete_many({"_id": {"$in": ids}}).deleted_count if ids else 0
+        progress = {f"deleted.{name}": done}
+
+    if done:
+        db.reset_jobs.update_one(
+            {"_id": job_id},
+            {"$inc": progress, "$set": {"updated_at": now}},
+        )
+    else:
+        db.reset_jobs.update_one(
+            {"_id": job_id, "stage": stage},
+            {"$set": {"stage": stage + 1, "updated_at": now}},
+        )
+    return db.reset_jobs.find_one({"_id": job_id})
+
+
+def _finish_reset_job(db, job: Dict[str, Any]) -> Dict[str, Any]:
+    db.reset_jobs.update_one(
+        {"_id": job["_id"], "status": {"$ne": "done"}},
+        {"$set": {"status": "done", "finished_at": datetime.utcnow()}},
+    )
+    # Only lift the marker if a newer reset has not replaced it.
+    db.galaxy_revisions.update_one(
+        {"user_id": job["user_id"], "hidden_before": job["cutoff"]},
+        {"$unset": {"hidden_before": ""}},
+    )
+    return db.reset_jobs.find_one({"_id": job["_id"]})
+
+
+def run_reset_job(job_id: ObjectId) -> None:
+    """
+    Drive a reset job to completion. Meant for a background thread; where
+    the platform freezes threads after the response, polling the status
+    endpoint advances the job instead.
+    """
+    try:
+        db = get_db()
+        while True:
+            job = advance_reset_job(db, job_id)
+            if job is None or job["status"] == "done":
+                return
+    except Exception as exc:
+        print(f"Reset job {job_id} stopped: {exc}")
+
+
+def start_reset_thread(job_id: ObjectId) -> None:
+    threading.Thread(target=run_reset_job, args=(job_id,), daemon=True).start()
+
+
+def serialize_reset_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    stage = job.get("stage", 0)
+    return {
+        "id": str(job["_id"]),
+        "status": job.get("status"),
+        "stage": RESET_STAGES[stage] if stage < len(RESET_STAGES) else None,
+        "deleted": job.get("deleted", {}),
+        "cleared_days": job.get("cleared_days", 0),
+        "created_at": job.get("created_at"),
+        "finished_at": job.get("finished_at"),
+    }
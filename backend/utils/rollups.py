@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Sequence
+
+
+HOURS_PER_WEEK = 7 * 24
+
+# Longest mood name kept as a rollup key.
+MAX_MOOD_KEY = 64
+
+
+def day_key(value: datetime | date | None = None) -> str:
+    """
+    Rollup bucket for a timestamp: the UTC calendar day as YYYY-MM-DD.
+    """
+    if value is None:
+        value = datetime.utcnow()
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def completion_day(task: Dict[str, Any]) -> str:
+    """
+    Day a task's completion was counted on. Tasks completed before
+    completed_at existed are attributed to their creation day.
+    """
+    return day_key(task.get("completed_at") or task.get("created_at"))
+
+
+def occurrence_completion_day(task: Dict[str, Any], occurrence: str) -> str:
+    """
+    Day the completion of one occurrence (YYYY-MM-DD) of a recurring task
+    was counted on; the occurrence itself when no time was kept.
+    """
+    stamp = (task.get("occurrence_completed_at") or {}).get(occurrence)
+    return day_key(stamp) if stamp else occurrence
+
+
+def task_completion_days(task: Dict[str, Any]) -> List[str]:
+    """
+    Days a task counts towards tasks_completed: one for the task itself
+    when completed, one per completed occurrence of a recurring task.
+    """
+    days = [completion_day(task)] if task.get("completed") else []
+    days += [occurrence_completion_day(task, d) for d in task.get("completed_dates") or ()]
+    return days
+
+
+def mood_key(mood: str | None) -> str:
+    """
+    Mood as a rollup field name. Moods come from clients and end up in
+    update paths, so "." (which would nest) and a leading "$" (which
+    MongoDB rejects) are neutralised; an empty result is "neutral".
+    """
+    key = str(mood or "").strip().lower().replace(".", "_").replace("\x00", "").lstrip("$")
+    return key[:MAX_MOOD_KEY] or "neutral"
+
+
+def record_session(db, user_id: str, started_at: datetime, minutes: float, mood: str) -> None:
+    """
+    Add one focus session to the user's daily rollup.
+    """
+    db.daily_stats.update_one(
+        {"user_id": user_id, "day": day_key(started_at)},
+        {
+            "$inc": {
+                "focus_minutes": minutes,
+                "sessions": 1,
+                f"mood_minutes.{mood_key(mood)}": minutes,
+            }
+        },
+        upsert=True,
+    )
+
+
+def record_task_completion(db, user_id: str, day: str, delta: int = 1) -> None:
+    """
+    Count (delta=1) or un-count (delta=-1) a completed task on `day`.
+    """
+    db.daily_stats.update_one(
+        {"user_id": user_id, "day": day},
+        {"$inc": {"tasks_completed": delta}},
+        upsert=True,
+    )
+
+
+def hour_of_week(moment: datetime, tz) -> int:
+    """
+    Heatmap cell of `moment` (naive values are taken as UTC) in `tz`:
+    weekday * 24 + hour, Monday 00:00 being cell 0.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    local = moment.astimezone(tz)
+    return local.weekday() * 24 + local.hour
+
+
+def record_heatmap(db, user_id: str, cell: int, minutes: float, mood: str) -> None:
+    """
+    Add one session to the user's weekday x hour x mood focus cube.
+    """
+    db.focus_heatmap.update_one(
+        {"user_id": user_id},
+        {"$inc": {f"minutes.{mood_key(mood)}.{cell}": minutes, f"sessions.{cell}": 1}},
+        upsert=True,
+    )
+
+
+def read_heatmap(db, user_id: str, mood: str | None = None) -> Dict[str, Any]:
+    """
+    The focus cube as dense 7 x 24 grids (rows Monday..Sunday, columns
+    hours): minutes per mood, their sum and session counts. Pass `mood` to
+    fetch only that mood's grid.
+    """
+    projection: Dict[str, Any] = {"_id": 0, "sessions": 1}
+    projection[f"minutes.{mood}" if mood else "minutes"] = 1
+    doc = db.focus_heatmap.find_one({"user_id": user_id}, projection) or {}
+
+    def grid(cells: Dict[str, float]) -> List[List[float]]:
+        flat = [0.0] * HOURS_PER_WEEK
+        for key, value in (cells or {}).items():
+            if key.isdigit() and int(key) < HOURS_PER_WEEK:
+                flat[int(key)] = float(value or 0)
+        return [flat[d * 24:(d + 1) * 24] for d in range(7)]
+
+    by_mood = {name: grid(cells) for name, cells in (doc.get("minutes") or {}).items()}
+    total = [[0.0] * 24 for _ in range(7)]
+    for rows in by_mood.values():
+        for d in range(7):
+            for h in range(24):
+                total[d][h] += rows[d][h]
+    return {
+        "minutes": total,
+        "by_mood": by_mood,
+        "sessions": [[int(v) for v in row] for row in grid(doc.get("sessions") or {})],
+    }
+
+
+def clear_heatmap(db, user_id: str) -> None:
+    db.focus_heatmap.delete_one({"user_id": user_id})
+
+
+_NO_FOCUS = {"focus_minutes": 0, "sessions": 0, "mood_minutes": {}}
+
+
+def clear_focus_day(db, user_id: str, day: str) -> None:
+    """
+    Drop one day's session-derived numbers after a galaxy reset deleted
+    its sessions. Task completions are kept: tasks survive a reset.
+    """
+    db.daily_stats.update_one({"user_id": user_id, "day": day}, {"$set": _NO_FOCUS})
+
+
+def clear_focus(db, user_id: str, before: str, limit: int) -> int:
+    """
+    clear_focus_day for up to `limit` days before `before` that still have
+    focus numbers. Returns how many were cleared; 0 means none are left.
+    """
+    query = {
+        "user_id": user_id,
+        "day": {"$lt": before},
+        "$or": [{"focus_minutes": {"$gt": 0}}, {"sessions": {"$gt": 0}}],
+    }
+    ids = [d["_id"] for d in db.daily_stats.find(query, {"_id": 1}).limit(limit)]
+    if ids:
+        db.daily_stats.update_many({"_id": {"$in": ids}}, {"$set": _NO_FOCUS})
+    return len(ids)
+
+
+def _day_range(user_id: str, start: str | None, end: str | None) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"user_id": user_id}
+    if start or end:
+        query["day"] = {}
+        if start:
+            query["day"]["$gte"] = start
+        if end:
+            query["day"]["$lte"] = end
+    return query
+
+
+def read_days(
+    db,
+    user_id: str,
+    start: str | None = None,
+    end: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rollup documents for start..end (inclusive day keys), oldest first.
+    Pass `fields` to fetch only those (plus `day`).
+    """
+    if fields is None:
+        projection: Dict[str, Any] = {"_id": 0, "user_id": 0}
+    else:
+        projection = {"_id": 0, "day": 1, **{f: 1 for f in fields}}
+    return list(
+        db.daily_stats.find(_day_range(user_id, start, end), projection).sort("day", 1)
+    )
+
+
+def summarize_days(db, user_id: str, start: str | None = None, end: str | None = None) -> Dict[str, Any]:
+    """
+    Totals over start..end computed by the server in one $group, so only a
+    single small document crosses the wire however long the history is.
+    """
+    pipeline = [
+        {"$match": _day_range(user_id, start, end)},
+        {
+            "$group": {
+                "_id": None,
+                "focus_minutes": {"$sum": "$focus_minutes"},
+                "sessions": {"$sum": "$sessions"},
+                "tasks_completed": {"$sum": "$tasks_completed"},
+            }
+        },
+        {"$project": {"_id": 0}},
+    ]
+    totals = next(db.daily_stats.aggregate(pipeline), None) or {}
+    return {
+        "focus_minutes": float(totals.get("focus_minutes", 0) or 0),
+        "sessions": int(totals.get("sessions", 0) or 0),
+        "tasks_completed": int(totals.get("tasks_completed", 0) or 0),
+    }
+
+
+def dashboard_facets(db, user_id: str, week_start: str, week_end: str) -> Dict[str, Any]:
+    """
+    Lifetime totals and the per-day documents of one week from a single
+    $facet aggregation over the rollup.
+    """
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {
+            "$facet": {
+                "totals": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "focus_minutes": {"$sum": "$focus_minutes"},
+                            "sessions": {"$sum": "$sessions"},
+                            "tasks_completed": {"$sum": "$tasks_completed"},
+                        }
+                    },
+                ],
+                "week": [
+                    {"$match": {"day": {"$gte": week_start, "$lte": week_end}}},
+                    {"$project": {"_id": 0, "day": 1, "focus_minutes": 1}},
+                ],
+            }
+        },
+    ]
+    result = next(db.daily_stats.aggregate(pipeline), None) or {}
+    totals = (result.get("totals") or [{}])[0]
+    return {
+        "totals": {
+            "focus_minutes": float(totals.get("focus_minutes", 0) or 0),
+            "sessions": int(totals.get("sessions", 0) or 0),
+            "tasks_completed": int(totals.get("tasks_completed", 0) or 0),
+        },
+        "week": result.get("week") or [],
+    }
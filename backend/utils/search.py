@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any, Dict, List
+
+# Stored prefixes per word run from MIN_PREFIX to MAX_PREFIX characters;
+# query terms longer than MAX_PREFIX are matched on their first
+# MAX_PREFIX characters and then checked exactly when ranking.
+MIN_PREFIX = 2
+MAX_PREFIX = 16
+
+# Index-only fields, left out of task responses.
+TERM_FIELDS = ("title_terms", "description_terms", "search_terms")
+
+# Upper bound on the candidates one search ranks in memory.
+MAX_SEARCH_CANDIDATES = 1000
+
+_WORD = re.compile(r"\w+")
+
+# Ranking weights: where a query term hits, and how well.
+TITLE_WORD = 3.0
+TITLE_PREFIX = 2.0
+DESCRIPTION_WORD = 1.5
+DESCRIPTION_PREFIX = 1.0
+
+
+def tokenize(text: str | None) -> List[str]:
+    """
+    Lower-cased, accent-folded words of `text`.
+    """
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", str(text).lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return _WORD.findall(folded)
+
+
+def text_terms(text: str | None) -> List[str]:
+    """
+    Every prefix (MIN_PREFIX to MAX_PREFIX characters) of every word in
+    `text`.
+    """
+    terms = set()
+    for word in tokenize(text):
+        for n in range(MIN_PREFIX, min(len(word), MAX_PREFIX) + 1):
+            terms.add(word[:n])
+    return sorted(terms)
+
+
+def search_terms(title: str | None, description: str | None) -> List[str]:
+    """
+    Value of a task's `search_terms` field: the prefixes of the title and
+    description together. A multikey index on it turns prefix search into
+    index lookups.
+    """
+    return sorted(set(text_terms(title)) | set(text_terms(description)))
+
+
+def search_fields(title: str | None, description: str | None) -> Dict[str, List[str]]:
+    """
+    Every search field of a task. The per-text `title_terms` and
+    `description_terms` let an edit of one text rebuild `search_terms`
+    inside the same update, from the other text's stored terms.
+    """
+    title_terms = text_terms(title)
+    description_terms = text_terms(description)
+    return {
+        "title_terms": title_terms,
+        "description_terms": description_terms,
+        "search_terms": sorted(set(title_terms) | set(description_terms)),
+    }
+
+
+def query_terms(q: str | None) -> List[str]:
+    """
+    Distinct searchable words of a query, in order; shorter ones are
+    dropped.
+    """
+    seen: List[str] = []
+    for word in tokenize(q):
+        if len(word) >= MIN_PREFIX and word not in seen:
+            seen.append(word)
+    return seen
+
+
+def search_filter(user_id: str, terms: List[str]) -> Dict[str, Any]:
+    """
+    Tasks containing a word starting with every term.
+    """
+    return {"user_id": user_id, "search_terms": {"$all": [t[:MAX_PREFIX] for t in terms]}}
+
+
+def score(doc: Dict[str, Any], terms: List[str]) -> float:
+    """
+    Relevance of a task for the query terms: title hits outweigh
+    description hits and whole-word hits outweigh prefix hits. Zero when a
+    long term only matched on its stored prefix.
+    """
+    title = tokenize(doc.get("title"))
+    description = tokenize(doc.get("description"))
+    total = 0.0
+    for term in terms:
+        if term in title:
+            best = TITLE_WORD
+        elif any(w.startswith(term) for w in title):
+            best = TITLE_PREFIX
+        elif term in description:
+            best = DESCRIPTION_WORD
+        elif any(w.startswith(term) for w in description):
+            best = DESCRIPTION_PREFIX
+        else:
+            return 0.0
+        total += best
+    return total
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+Point = Sequence[float]
+
+# Histogram bins for distances from the centroid and between point pairs,
+# both measured in units of the RMS radius.
+RADIAL_BINS = 12
+RADIAL_MAX = 2.5
+PAIR_BINS = 12
+PAIR_MAX = 4.0
+
+# Large galaxies are sampled down to this many points before the
+# (quadratic) pairwise histogram is built.
+MAX_SAMPLE_POINTS = 256
+
+# Below this size plain Python beats NumPy's per-call overhead, which
+# matters when thousands of small presets are indexed at startup.
+VECTORIZE_MIN_POINTS = 32
+
+DESCRIPTOR_SIZE = RADIAL_BINS + PAIR_BINS
+
+
+def _sample(points: Sequence[Point]) -> List[tuple[float, float]]:
+    pts = [(float(p[0]), float(p[1])) for p in points]
+    if len(pts) <= MAX_SAMPLE_POINTS:
+        return pts
+    stride = len(pts) / MAX_SAMPLE_POINTS
+    return [pts[int(i * stride)] for i in range(MAX_SAMPLE_POINTS)]
+
+
+def _histogram(values: Sequence[float], bins: int, upper: float) -> List[float]:
+    counts = [0.0] * bins
+    for v in values:
+        counts[min(int(v / upper * bins), bins - 1)] += 1
+    total = sum(counts)
+    return [c / total for c in counts] if total else counts
+
+
+def shape_descriptor(points: Sequence[Point]) -> List[float]:
+    """
+    Fixed-length signature of a point set that ignores position, scale,
+    rotation and point order: a histogram of centroid distances followed by
+    a histogram of pairwise distances, both normalised by the RMS radius.
+    """
+    pts = _sample(points)
+    if len(pts) < 2:
+        return [0.0] * DESCRIPTOR_SIZE
+
+    if np is not None and len(pts) >= VECTORIZE_MIN_POINTS:
+        arr = np.asarray(pts)
+        centered = arr - arr.mean(axis=0)
+        radial = np.hypot(centered[:, 0], centered[:, 1])
+        scale = math.sqrt(float((radial ** 2).mean()))
+        if scale == 0:
+            return [0.0] * DESCRIPTOR_SIZE
+        i, j = np.triu_indices(len(arr), k=1)
+        pair = np.hypot(*(centered[i] - centered[j]).T) / scale
+        r_hist = np.histogram(np.minimum(radial / scale, RADIAL_MAX * 0.999), RADIAL_BINS, (0, RADIAL_MAX))[0]
+        p_hist = np.histogram(np.minimum(pair, PAIR_MAX * 0.999), PAIR_BINS, (0, PAIR_MAX))[0]
+        return (r_hist / r_hist.sum()).tolist() + (p_hist / p_hist.sum()).tolist()
+
+    cx = sum(p[0] for p in pts) / len(pts)
+    cy = sum(p[1] for p in pts) / len(pts)
+    centered = [(x - cx, y - cy) for x, y in pts]
+    radial = [math.hypot(x, y) for x, y in centered]
+    scale = math.sqrt(sum(r * r for r in radial) / len(radial))
+    if scale == 0:
+        return [0.0] * DESCRIPTOR_SIZE
+    pair = [
+        math.hypot(a[0] - b[0], a[1] - b[1]) / scale
+        for idx, a in enumerate(centered)
+        for b in centered[idx + 1:]
+    ]
+    return _histogram([r / scale for r in radial], RADIAL_BINS, RADIAL_MAX) + _histogram(
+        pair, PAIR_BINS, PAIR_MAX
+    )
+
+
+class ShapeIndex:
+    """
+    Nearest-neighbour index over constellation shape descriptors.
+
+    Descriptors are computed once when the index is built; a lookup is a
+    single vectorised distance computation against the stacked matrix.
+    """
+
+    def __init__(self, patterns: Dict[str, Sequence[Dict[str, float]]]):
+        self.names: List[str] = []
+        vectors: List[List[float]] = []
+        for name, pattern in patterns.items():
+            try:
+                points = [(float(p["x"]), float(p["y"])) for p in pattern]
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.names.append(name)
+            vectors.append(shape_descriptor(points))
+        self._vectors = vectors
+        self._matrix = np.asarray(vectors, dtype=np.float64) if np is not None and vectors else None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def nearest(self, descriptor: Sequence[float], k: int = 3) -> List[tuple[str, float]]:
+        """
+        The k closest patterns as (name, distance), closest first.
+        """
+        if not self.names or k <= 0:
+            return []
+        k = min(k, len(self.names))
+
+        if self._matrix is not None:
+            dist = np.sqrt(((self._matrix - np.asarray(descriptor)) ** 2).sum(axis=1))
+            top = np.argpartition(dist, k - 1)[:k]
+            top = top[np.argsort(dist[top])]
+            return [(self.names[i], float(dist[i])) for i in top]
+
+        scored = [
+            (math.sqrt(sum((a - b) ** 2 for a, b in zip(vec, descriptor))), name)
+            for name, vec in zip(self.names, self._vectors)
+        ]
+        scored.sort()
+        return [(name, dist) for dist, name in scored[:k]]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Any, Dict, List
+
+
+# World units per grid tile. Stars sit on a golden-angle spiral with
+# c = 7, so a tile holds roughly a few dozen stars near the core.
+TILE_SIZE = 64.0
+
+# Below this zoom level dense areas are returned as clusters.
+DETAIL_ZOOM = 1.0
+
+# On-screen size (px) of one cluster cell.
+CLUSTER_CELL_PX = 32.0
+
+
+def tile_key(x: float, y: float) -> tuple[int, int]:
+    """
+    Grid tile containing the point (x, y).
+    """
+    return int(math.floor(x / TILE_SIZE)), int(math.floor(y / TILE_SIZE))
+
+
+def tile_fields(x: float, y: float) -> Dict[str, int]:
+    """
+    Fields to store next to x/y so viewport queries can use the
+    (user_id, tile_x, tile_y) index.
+    """
+    tx, ty = tile_key(x, y)
+    return {"tile_x": tx, "tile_y": ty}
+
+
+class SpatialHash:
+    """
+    Uniform grid of circles for quick overlap checks.
+
+    `cell_size` must be at least the largest possible center distance of
+    two overlapping circles, so a lookup only needs the 3x3 neighbouring
+    cells.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = max(cell_size, 1.0)
+        self._cells: Dict[tuple[int, int], List[tuple[float, float, float]]] = defaultdict(list)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def insert(self, x: float, y: float, radius: float) -> None:
+        self._cells[self._cell(x, y)].append((x, y, radius))
+
+    def overlaps(self, x: float, y: float, radius: float, padding: float = 0.0) -> bool:
+        cx, cy = self._cell(x, y)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for ox, oy, orad in self._cells.get((cx + dx, cy + dy), ()):
+                    if math.hypot(x - ox, y - oy) < radius + orad + padding:
+                        return True
+        return False
+
+
+def parse_bbox(raw: str | None) -> tuple[float, float, float, float] | None:
+    """
+    Parse "minx,miny,maxx,maxy". Returns None when malformed.
+    """
+    if not raw:
+        return None
+    try:
+        min_x, min_y, max_x, max_y = (float(v) for v in raw.split(","))
+    except ValueError:
+        return None
+    if not all(math.isfinite(v) for v in (min_x, min_y, max_x, max_y)):
+        return None
+    if min_x > max_x or min_y > max_y:
+        return None
+    return min_x, min_y, max_x, max_y
+
+
+def bbox_query(user_id: str, bbox: tuple[float, float, float, float]) -> Dict[str, Any]:
+    """
+    Mongo filter for objects inside bbox.
+
+    The tile bounds are what the index scans; the exact x/y bounds then trim
+    the edge tiles.
+    """
+    min_x, min_y, max_x, max_y = bbox
+    min_tx, min_ty = tile_key(min_x, min_y)
+    max_tx, max_ty = tile_key(max_x, max_y)
+    return {
+        "user_id": user_id,
+        "tile_x": {"$gte": min_tx, "$lte": max_tx},
+        "tile_y": {"$gte": min_ty, "$lte": max_ty},
+        "x": {"$gte": min_x, "$lte": max_x},
+        "y": {"$gte": min_y, "$lte": max_y},
+    }
+
+
+def cluster_pipeline(match: Dict[str, Any], zoom: float) -> List[Dict[str, Any]]:
+    """
+    Aggregation that buckets matching objects into square cells sized to
+    CLUSTER_CELL_PX on screen at the given zoom.
+    """
+    cell = CLUSTER_CELL_PX / zoom
+    return [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {
+                    "cx": {"$floor": {"$divide": ["$x", cell]}},
+                    "cy": {"$floor": {"$divide": ["$y", cell]}},
+                },
+                "count": {"$sum": 1},
+                "x": {"$avg": "$x"},
+                "y": {"$avg": "$y"},
+                "radius": {"$max": "$radius"},
+                "sample": {"$first": "$$ROOT"},
+            }
+        },
+    ]
@@ -4,13 +4,28 @@ import math
 import random
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
 
 from .db import get_default_user_id
+from .galaxy_sync import next_star_slot
+from .reset_jobs import visible_filter
+from .spatial import SpatialHash, bbox_query, tile_fields
 
 
 GOLDEN_ANGLE = 2.399963229728653
 
+# Overlap avoidance: largest radius duration_to_radius() can return, the
+# gap kept between bodies, and how many rings of nudges to try.
+MAX_RADIUS = 40.0
+OVERLAP_PADDING = 2.0
+NUDGE_RINGS = 4
+NUDGE_DIRECTIONS = 8
+
 
 @dataclass
 class CelestialObject:
@@ -23,6 +38,9 @@ class CelestialObject:
     y: float
     created_at: datetime
     meta: Dict[str, Any]
+    rev: int = 0
+    # Database _id once inserted; not part of the stored document.
+    id: Any = None
 
     def to_mongo(self) -> Dict[str, Any]:
         return {
@@ -33,8 +51,10 @@ class CelestialObject:
             "color": self.color,
             "x": self.x,
             "y": self.y,
+            **tile_fields(self.x, self.y),
             "created_at": self.created_at,
             "meta": self.meta,
+            "rev": self.rev,
         }
 
 
@@ -84,6 +104,74 @@ def compute_spiral_position(index: int, center_x: float, center_y: float, c: flo
     return x, y
 
 
+def compute_spiral_positions(
+    start: int,
+    count: int,
+    center_x: float,
+    center_y: float,
+    c: float = 7.0,
+) -> tuple[List[float], List[float]]:
+    """
+    Batch version of compute_spiral_position for indices start..start+count-1.
+
+    Vectorized with NumPy when available, plain loops otherwise.
+    """
+    if count <= 0:
+        return [], []
+
+    if np is not None:
+        index = np.arange(start, start + count, dtype=np.float64)
+        theta = index * GOLDEN_ANGLE
+        r = c * np.sqrt(index)
+        rng = np.random.default_rng()
+        xs = center_x + r * np.cos(theta) + rng.uniform(-3.0, 3.0, count)
+        ys = center_y + r * np.sin(theta) + rng.uniform(-3.0, 3.0, count)
+        return xs.tolist(), ys.tolist()
+
+    xs, ys = [], []
+    for index in range(start, start + count):
+        x, y = compute_spiral_position(index, center_x, center_y, c)
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+
+def nudge_clear_of_neighbors(db, user_id: str, x: float, y: float, radius: float) -> tuple[float, float]:
+    """
+    Move a new body off any existing one it would overlap.
+
+    Neighbours within reach (ignoring stars hidden by a pending reset) are
+    fetched with one tile-indexed query and put in a spatial hash;
+    candidate spots on rings of growing distance are then tried until one
+    is free. If every candidate is taken the original spot is kept.
+    """
+    step = radius + OVERLAP_PADDING
+    reach = NUDGE_RINGS * step + radius + MAX_RADIUS + OVERLAP_PADDING
+    neighbors = db.celestial_objects.find(
+        {**visible_filter(db, user_id), **bbox_query(user_id, (x - reach, y - reach, x + reach, y + reach))},
+        {"x": 1, "y": 1, "radius": 1},
+    )
+
+    grid = SpatialHash(radius + MAX_RADIUS + OVERLAP_PADDING)
+    for doc in neighbors:
+        grid.insert(float(doc.get("x", 0) or 0), float(doc.get("y", 0) or 0), float(doc.get("radius", 0) or 0))
+    return _free_spot(grid, x, y, radius)
+
+
+def _free_spot(grid: SpatialHash, x: float, y: float, radius: float) -> tuple[float, float]:
+    if not grid.overlaps(x, y, radius, OVERLAP_PADDING):
+        return x, y
+    step = radius + OVERLAP_PADDING
+    for ring in range(1, NUDGE_RINGS + 1):
+        for k in range(NUDGE_DIRECTIONS):
+            angle = 2 * math.pi * k / NUDGE_DIRECTIONS
+            cx = x + ring * step * math.cos(angle)
+            cy = y + ring * step * math.sin(angle)
+            if not grid.overlaps(cx, cy, radius, OVERLAP_PADDING):
+                return cx, cy
+    return x, y
+
+
 def create_celestial_for_session(
     *,
     db,
@@ -91,9 +179,14 @@ def create_celestial_for_session(
     duration_minutes: float,
     mood: str,
     meta: Dict[str, Any] | None = None,
+    avoid_overlap: bool = True,
 ) -> CelestialObject:
     """
     Generate a celestial object for a finished focus session and insert it.
+
+    The spiral index comes from a per-user atomic counter, so the cost does
+    not grow with the galaxy. With `avoid_overlap` the body is nudged away
+    from existing ones it would sit on top of.
     """
     user_id = get_default_user_id()
     mood_key = (mood or "neutral").lower()
@@ -102,13 +195,15 @@ def create_celestial_for_session(
     obj_type = duration_to_type(duration_minutes)
     radius = duration_to_radius(duration_minutes)
 
-    # Count existing objects for this user to position the new one.
-    star_count = db.celestial_objects.count_documents({"user_id": user_id})
+    # Reserve this object's spiral slot (and its sync revision).
+    star_index, rev = next_star_slot(db, user_id)
 
     # Use a logical center within the canvas; the frontend can treat
     # (0, 0) as the center, so we keep coordinates around origin.
     center_x, center_y = 0.0, 0.0
-    x, y = compute_spiral_position(star_count + 1, center_x, center_y)
+    x, y = compute_spiral_position(star_index, center_x, center_y)
+    if avoid_overlap:
+        x, y = nudge_clear_of_neighbors(db, user_id, x, y, radius)
 
     obj = CelestialObject(
         user_id=user_id,
@@ -120,9 +215,72 @@ def create_celestial_for_session(
         y=y,
         created_at=datetime.utcnow(),
         meta=meta or {"duration_minutes": duration_minutes, "mood": mood_key},
+        rev=rev,
     )
 
-    db.celestial_objects.insert_one(obj.to_mongo())
+    obj.id = db.celestial_objects.insert_one(obj.to_mongo()).inserted_id
     return obj
 
 
+def create_celestials_batch(
+    *,
+    db,
+    user_id: str,
+    specs: List[Dict[str, Any]],
+    avoid_overlap: bool = True,
+) -> List[CelestialObject]:
+    """
+    Create one celestial object per spec ({session_id, duration_minutes,
+    mood, meta}) with a constant number of round trips: one counter
+    update reserves all spiral slots, one tile query (an $or of every
+    star's own neighbourhood; consecutive spiral slots point in all
+    directions, so one box around them all would span the galaxy) fetches
+    the neighbours and one insert_many stores the batch.
+
+    Returns the objects, with their inserted ids, in spec order.
+    """
+    if not specs:
+        return []
+
+    first, rev = next_star_slot(db, user_id, len(specs))
+    xs, ys = compute_spiral_positions(first, len(specs), 0.0, 0.0)
+    radii = [duration_to_radius(float(s.get("duration_minutes", 0) or 0)) for s in specs]
+
+    grid = SpatialHash(2 * MAX_RADIUS + OVERLAP_PADDING)
+    if avoid_overlap:
+        reach = NUDGE_RINGS * (MAX_RADIUS + OVERLAP_PADDING) + 2 * MAX_RADIUS + OVERLAP_PADDING
+        around = [bbox_query(user_id, (x - reach, y - reach, x + reach, y + reach)) for x, y in zip(xs, ys)]
+        neighbors = db.celestial_objects.find(
+            {**visible_filter(db, user_id), "$or": around}, {"x": 1, "y": 1, "radius": 1}
+        )
+        for doc in neighbors:
+            grid.insert(float(doc.get("x", 0) or 0), float(doc.get("y", 0) or 0), float(doc.get("radius", 0) or 0))
+
+    now = datetime.utcnow()
+    objects = []
+    for spec, x, y, radius in zip(specs, xs, ys, radii):
+        if avoid_overlap:
+            x, y = _free_spot(grid, x, y, radius)
+            # Later stars of the batch must also keep clear of this one.
+            grid.insert(x, y, radius)
+        duration = float(spec.get("duration_minutes", 0) or 0)
+        mood_key = (spec.get("mood") or "neutral").lower()
+        objects.append(
+            CelestialObject(
+                user_id=user_id,
+                session_id=spec["session_id"],
+                type=duration_to_type(duration),
+                radius=radius,
+                color=MOOD_COLOR_MAP.get(mood_key, MOOD_COLOR_MAP["neutral"]),
+                x=x,
+                y=y,
+                created_at=now,
+                meta=spec.get("meta") or {"duration_minutes": duration, "mood": mood_key},
+                rev=rev,
+            )
+        )
+
+    result = db.celestial_objects.insert_many([obj.to_mongo() for obj in objects])
+    for obj, inserted_id in zip(objects, result.inserted_ids):
+        obj.id = inserted_id
+    return objects
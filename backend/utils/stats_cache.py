@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict
+
+from flask import jsonify, request
+
+from .db import get_db, get_default_user_id
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+
+# Bounds of the in-process cache. Entries are small JSON payloads.
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "1024"))
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "300"))
+
+# Optional shared backend, e.g. redis://localhost:6379/0. When set, the
+# per-user data version and the payloads live there, so a warm entry is
+# served by any instance without touching MongoDB.
+STATS_CACHE_REDIS_URL = os.getenv("STATS_CACHE_REDIS_URL")
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used mapping whose entries also expire
+    `ttl` seconds after they were stored.
+    """
+
+    def __init__(self, max_entries: int = STATS_CACHE_SIZE, ttl: float = STATS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local = LRUCache()
+_shared = None
+
+
+def _shared_client():
+    global _shared
+    if _shared is None and STATS_CACHE_REDIS_URL and redis is not None:
+        _shared = redis.Redis.from_url(STATS_CACHE_REDIS_URL, socket_timeout=0.5)
+    return _shared
+
+
+def bump_data_version(db, user_id: str) -> None:
+    """
+    Mark the user's stats inputs as changed. Every write to sessions,
+    tasks or the galaxy calls this; cached stats computed under an older
+    version are never served again.
+    """
+    shared = _shared_client()
+    if shared is not None:
+        try:
+            shared.incr(f"stats:ver:{user_id}")
+            return
+        except redis.RedisError as exc:
+            print(f"Stats cache version bump failed: {exc}")
+    db.data_versions.update_one({"user_id": user_id}, {"$inc": {"v": 1}}, upsert=True)
+
+
+def data_version(db, user_id: str) -> int | None:
+    """
+    Current data version of a user, or None when it cannot be read (the
+    caller should then skip the cache).
+    """
+    shared = _shared_client()
+    if shared is not None:
+        try:
+            return int(shared.get(f"stats:ver:{user_id}") or 0)
+        except redis.RedisError:
+            return None
+    doc = db.data_versions.find_one({"user_id": user_id}, {"_id": 0, "v": 1})
+    return int(doc["v"]) if doc else 0
+
+
+def _cache_get(key: str) -> Any | None:
+    value = _local.get(key)
+    if value is not None:
+        return value
+    shared = _shared_client()
+    if shared is None:
+        return None
+    try:
+        raw = shared.get(f"stats:{key}")
+    except redis.RedisError:
+        return None
+    if raw is None:
+        return None
+    value = json.loads(raw)
+    _local.set(key, value)
+    return value
+
+
+def _cache_set(key: str, value: Any) -> None:
+    _local.set(key, value)
+    shared = _shared_client()
+    if shared is None:
+        return
+    try:
+        shared.setex(f"stats:{key}", int(STATS_CACHE_TTL), json.dumps(value, default=str))
+    except redis.RedisError:
+        pass
+
+
+def cached_stats(view: Callable) -> Callable:
+    """
+    Serve a stats view from the cache while the user's data version is
+    unchanged. The key also carries the query string and the UTC day, so
+    day-relative answers (streaks, the last 7 days) roll over at midnight.
+    Only successful JSON responses are stored.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        db = get_db()
+        user_id = get_default_user_id()
+        version = data_version(db, user_id)
+        if version is None:
+            return view(*args, **kwargs)
+
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        key = f"{user_id}:{version}:{request.path}?{query}:{datetime.utcnow().date().isoformat()}"
+
+        cached = _cache_get(key)
+        if cached is not None:
+            return jsonify(cached)
+
+        response = view(*args, **kwargs)
+        if getattr(response, "status_code", None) == 200 and response.is_json:
+            _cache_set(key, response.get_json())
+        return response
+
+    return wrapper
+
+
+def clear_local_cache() -> None:
+    _local.clear()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pymongo.errors import DuplicateKeyError
+
+
+def resolve_timezone(name: str | None):
+    """
+    ZoneInfo for an IANA name such as "Asia/Kolkata"; UTC when missing or
+    unknown.
+    """
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(str(name))
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def tz_name(tz) -> str:
+    return getattr(tz, "key", None) or "UTC"
+
+
+def local_day(moment: datetime, tz) -> date:
+    """
+    Calendar day of `moment` (naive values are taken as UTC) in `tz`.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(tz).date()
+
+
+def _seed_from_rollup(db, user_id: str) -> Dict[str, Any]:
+    """
+    One-off streak state for users who had sessions before streak tracking
+    existed, rebuilt from the (UTC) daily rollup.
+    """
+    current = longest = 0
+    last = None
+    for doc in db.daily_stats.find(
+        {"user_id": user_id, "sessions": {"$gt": 0}}, {"_id": 0, "day": 1}
+    ).sort("day", 1):
+        day = date.fromisoformat(doc["day"])
+        current = current + 1 if last is not None and day - last == timedelta(days=1) else 1
+        longest = max(longest, current)
+        last = day
+    return {
+        "current": current,
+        "longest": longest,
+        "last_day": last.isoformat() if last else None,
+    }
+
+
+def record_active_day(db, user_id: str, moment: datetime, tz) -> Dict[str, Any]:
+    """
+    Fold one focus session into the user's streak state in O(1).
+
+    The state is updated with a compare-and-set on the values it was
+    computed from, so concurrent sessions cannot double count a day.
+    """
+    today = local_day(moment, tz)
+    for _ in range(5):
+        state = db.streaks.find_one({"user_id": user_id})
+        if state is None:
+            seeded = {"user_id": user_id, **_seed_from_rollup(db, user_id), "timezone": tz_name(tz)}
+            try:
+                db.streaks.insert_one(seeded)
+            except DuplicateKeyError:
+                pass
+            continue
+
+        last = date.fromisoformat(state["last_day"]) if state.get("last_day") else None
+        if last is not None and last >= today:
+            current = state.get("current", 0)
+        elif last is not None and today - last == timedelta(days=1):
+            current = state.get("current", 0) + 1
+        else:
+            current = 1
+        new_state = {
+            "current": current,
+            "longest": max(state.get("longest", 0), current),
+            "last_day": max(last, today).isoformat() if last else today.isoformat(),
+            "timezone": tz_name(tz),
+        }
+
+        result = db.streaks.update_one(
+            {
+                "user_id": user_id,
+                "last_day": state.get("last_day"),
+                "current": state.get("current", 0),
+            },
+            {"$set": new_state},
+        )
+        if result.matched_count:
+            return {"user_id": user_id, **new_state}
+    return db.streaks.find_one({"user_id": user_id}) or {}
+
+
+def read_streak(db, user_id: str, tz=None, now: datetime | None = None) -> Dict[str, Any]:
+    """
+    Current and longest streak without touching sessions. A streak stays
+    alive until the end of the local day after the last active day.
+    """
+    state = db.streaks.find_one({"user_id": user_id})
+    if state is None:
+        state = {"user_id": user_id, **_seed_from_rollup(db, user_id)}
+        try:
+            db.streaks.insert_one(dict(state))
+        except DuplicateKeyError:
+            pass
+    if tz is None:
+        tz = resolve_timezone(state.get("timezone"))
+    today = local_day(now or datetime.now(timezone.utc), tz)
+
+    last_day = state.get("last_day")
+    current = state.get("current", 0)
+    if not last_day or today - date.fromisoformat(last_day) > timedelta(days=1):
+        current = 0
+
+    return {
+        "current_streak_days": current,
+        "longest_streak_days": state.get("longest", 0),
+        "last_active_day": last_day,
+        "timezone": tz_name(tz),
+    }
+
+
+def clear_streak(db, user_id: str) -> None:
+    db.streaks.delete_one({"user_id": user_id})
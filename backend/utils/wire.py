@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+from flask import Response, jsonify, request
+
+
+COLUMNAR_MIMETYPE = "application/vnd.codegalaxy.columnar+json"
+BINARY_MIMETYPE = "application/vnd.codegalaxy.columnar"
+
+BINARY_MAGIC = b"CGX1"
+
+# Fields needed to build a columnar payload; used as the Mongo projection.
+STYLE_PROJECTION = {"x": 1, "y": 1, "radius": 1, "color": 1, "type": 1, "created_at": 1}
+LAYOUT_PROJECTION = {"x": 1, "y": 1}
+
+
+def negotiate_format() -> str:
+    """
+    Pick the wire format for a galaxy payload: "json", "columnar" or "binary".
+
+    `?format=` wins over the Accept header; plain JSON is the default so
+    existing clients are unaffected.
+    """
+    explicit = (request.args.get("format") or "").lower()
+    if explicit in ("json", "columnar", "binary"):
+        return explicit
+
+    best = request.accept_mimetypes.best_match(
+        ["application/json", COLUMNAR_MIMETYPE, BINARY_MIMETYPE],
+        default="application/json",
+    )
+    if best == COLUMNAR_MIMETYPE:
+        return "columnar"
+    if best == BINARY_MIMETYPE:
+        return "binary"
+    return "json"
+
+
+def _epoch_ms(value: Any) -> float:
+    if not isinstance(value, datetime):
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp() * 1000.0
+
+
+def build_columns(docs: Iterable[Dict[str, Any]], with_style: bool = True) -> Dict[str, Any]:
+    """
+    Turn celestial documents into parallel arrays.
+
+    Colors and types are palette-indexed: `color[i]` is an index into
+    `palette.color`. Timestamps are epoch milliseconds.
+    """
+    ids: List[str] = []
+    xs: List[float] = []
+    ys: List[float] = []
+    radii: List[float] = []
+    created: List[float] = []
+    color_idx: List[int] = []
+    type_idx: List[int] = []
+    palettes: Dict[str, Dict[str, int]] = {"color": {}, "type": {}}
+
+    for doc in docs:
+        ids.append(str(doc["_id"]))
+        xs.append(float(doc.get("x", 0) or 0))
+        ys.append(float(doc.get("y", 0) or 0))
+        if not with_style:
+            continue
+        radii.append(float(doc.get("radius", 0) or 0))
+        created.append(_epoch_ms(doc.get("created_at")))
+        color = palettes["color"]
+        type_ = palettes["type"]
+        color_idx.append(color.setdefault(doc.get("color") or "", len(color)))
+        type_idx.append(type_.setdefault(doc.get("type") or "", len(type_)))
+
+    columns: Dict[str, Any] = {"count": len(ids), "ids": ids, "x": xs, "y": ys}
+    if with_style:
+        columns.update(
+            {
+                "radius": radii,
+                "created_at": created,
+                "color": color_idx,
+                "type": type_idx,
+                "palette": {name: list(values) for name, values in palettes.items()},
+            }
+        )
+    return columns
+
+
+def columnar_json(columns: Dict[str, Any]) -> Response:
+    """
+    JSON encoding of build_columns() output. Coordinates are rounded to
+    hundredths of a pixel, which is all the canvas can show.
+    """
+    body = dict(columns)
+    for key in ("x", "y", "radius"):
+        if key in body:
+            body[key] = [round(v, 2) for v in body[key]]
+    response = jsonify(body)
+    response.mimetype = COLUMNAR_MIMETYPE
+    return response
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def columnar_binary(columns: Dict[str, Any]) -> Response:
+    """
+    Packed little-endian encoding of build_columns() output:
+
+        "CGX1" | uint32 count | uint32 header_len | header JSON (space padded
+        to an 8-byte boundary) | float64 created_at[n] | float32 x[n] |
+        float32 y[n] | float32 radius[n] | uint16 color[n] | uint16 type[n] |
+        12-byte ObjectId[n]
+
+    The header JSON carries the palettes and the list of sections present.
+    Layout payloads (no style) only contain x, y and ids. Every typed
+    section starts aligned to its element size so clients can view it
+    with a TypedArray directly.
+    """
+    count = columns["count"]
+    with_style = "radius" in columns
+    sections = ["created_at", "x", "y", "radius", "color", "type", "ids"] if with_style else ["x", "y", "ids"]
+    header = {"sections": sections, "palette": columns.get("palette", {})}
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix_len = len(BINARY_MAGIC) + 8
+    pad = (-(prefix_len + len(header_bytes))) % 8
+    header_bytes += b" " * pad
+
+    parts = [BINARY_MAGIC, struct.pack("<II", count, len(header_bytes)), header_bytes]
+    if with_style:
+        parts.append(_little_endian(array("d", columns["created_at"])))
+    parts.append(_little_endian(array("f", columns["x"])))
+    parts.append(_little_endian(array("f", columns["y"])))
+    if with_style:
+        parts.append(_little_endian(array("f", columns["radius"])))
+        parts.append(_little_endian(array("H", columns["color"])))
+        parts.append(_little_endian(array("H", columns["type"])))
+    parts.append(b"".join(bytes.fromhex(i) for i in columns["ids"]))
+
+    return Response(b"".join(parts), mimetype=BINARY_MIMETYPE)
+
+
+def columnar_response(fmt: str, docs: Iterable[Dict[str, Any]], with_style: bool = True) -> Response:
+    columns = build_columns(docs, with_style=with_style)
+    if fmt == "binary":
+        return columnar_binary(columns)
+    return columnar_json(columns)
@@ -12,6 +12,7 @@ let layoutDirty = false;
 let lockConstellation = false;
 let saveBtn, revertBtn, toastContainer, constellationSelect;
 let lastSavedLayout = null;
+let galaxyCursor = null;
 let globalToastHost = null;
 const CONSTELLATION_PRESETS = {
     Orion: [
@@ -90,20 +91,14 @@ function resizeCanvas() {
 // ==================== LOAD GALAXY DATA ====================
 async function loadGalaxy() {
     try {
-        const response = await fetch('/api/galaxy/data');
-        const objects = await response.json();
-
-        galaxyObjects = objects.map((obj, index) => ({
-            id: obj.id,
-            x: obj.x ?? 0,
-            y: obj.y ?? 0,
-            radius: obj.radius ?? 6,
-            color: obj.color || '#FFD700', // Golden default
-            type: obj.type || 'star',
-            created_at: obj.created_at ? new Date(obj.created_at) : new Date(),
-            // for simple animation timing
-            index,
-        }));
+        // Unsaved drags are discarded on reload, so ask for everything.
+        if (layoutDirty) galaxyCursor = null;
+        const since = galaxyCursor ?? '0';
+        const response = await fetch(`/api/galaxy/data?since=${encodeURIComponent(since)}`);
+        const delta = await response.json();
+
+        applyGalaxyDelta(delta);
+        galaxyCursor = delta.cursor;
 
         updateGalaxyStats();
         markLayoutDirty(false);
@@ -112,6 +107,42 @@ async function loadGalaxy() {
     }
 }
 
+function toGalaxyObject(obj, index) {
+    return {
+        id: obj.id,
+        x: obj.x ?? 0,
+        y: obj.y ?? 0,
+        radius: obj.radius ?? 6,
+        color: obj.color || '#FFD700', // Golden default
+        type: obj.type || 'star',
+        created_at: obj.created_at ? new Date(obj.created_at) : new Date(),
+        // for simple animation timing
+        index,
+    };
+}
+
+function applyGalaxyDelta(delta) {
+    const objects = delta.objects || [];
+    if (delta.full) {
+        galaxyObjects = objects.map(toGalaxyObject);
+        return;
+    }
+
+    const removed = new Set(delta.deleted || []);
+    const incoming = new Map(objects.map((obj) => [obj.id, obj]));
+
+    galaxyObjects = galaxyObjects.filter((obj) => !removed.has(obj.id));
+    galaxyObjects.forEach((obj) => {
+        const changed = incoming.get(obj.id);
+        if (!changed) return;
+        Object.assign(obj, toGalaxyObject(changed, obj.index));
+        incoming.delete(obj.id);
+    });
+    incoming.forEach((obj) => {
+        galaxyObjects.push(toGalaxyObject(obj, galaxyObjects.length));
+    });
+}
+
 // Make loadGalaxy available globally for task completion
 window.loadGalaxy = loadGalaxy;
 
@@ -295,12 +326,14 @@ async function resetGalaxy() {
 
         galaxyObjects = [];
         lastSavedLayout = null;
+        galaxyCursor = null;
         await loadGalaxy();
         if (typeof loadStats === 'function') {
             loadStats();
         }
 
         showToast('Galaxy reset.', 'success');
+        if (data.job) pollResetJob(data.job.id);
     } catch (error) {
         console.error('Error resetting galaxy:', error);
         showToast(`Reset failed: ${error.message || 'server error'}`, 'error');
@@ -309,6 +342,21 @@ async function resetGalaxy() {
 
 window.resetGalaxy = resetGalaxy;
 
+// Old data is already hidden; polling lets the server finish deleting it
+// in batches (each poll runs one batch).
+async function pollResetJob(jobId) {
+    try {
+        const resp = await fetch(`/api/galaxy/reset/${encodeURIComponent(jobId)}`);
+        if (!resp.ok) return;
+        const job = await resp.json();
+        if (job.status !== 'done') {
+            setTimeout(() => pollResetJob(jobId), 1000);
+        }
+    } catch (error) {
+        console.error('Error polling reset job:', error);
+    }
+}
+
 function initControls() {
     const select = document.getElementById('constellationSelect');
     const applyBtn = document.getElementById('applyConstellation');
@@ -412,58 +460,31 @@ function applyConstellation(name) {
 }
 
 async function mergeConstellation(name, pattern, needed, isLocked) {
-    const width = canvas.width;
-    const height = canvas.height;
-    const previousState = galaxyObjects.map(o => ({ id: o.id, x: o.x, y: o.y }));
-
-    const updates = [];
-    const newStars = [];
-
-    // 1. Prepare Updates (reuse existing)
-    let reuseCount = 0;
-    if (!isLocked) {
-        reuseCount = Math.min(pattern.length, galaxyObjects.length);
-        for (let i = 0; i < reuseCount; i++) {
-            const normalized = pattern[i];
-            updates.push({
-                id: galaxyObjects[i].id,
-                x: normalized.x * width,
-                y: normalized.y * height
-            });
-        }
-    }
-
-    // 2. Prepare New Stars
-    // If locked, we create ALL stars from pattern.
-    // If unlocked, we create only needed (starting from index reuseCount).
-    const startIndex = isLocked ? 0 : reuseCount;
-    for (let i = startIndex; i < pattern.length; i++) {
-        const normalized = pattern[i];
-        newStars.push({
-            x: normalized.x * width,
-            y: normalized.y * height,
-            radius: 4 + Math.random() * 3,
-            color: '#FFD700',
-            type: 'star'
-        });
-    }
-
     try {
-        const response = await fetch('/api/galaxy/layout/merge', {
+        // The server picks which stars move where (minimum total movement)
+        // and creates any stars the pattern still needs.
+        const response = await fetch('/api/galaxy/constellation/apply', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ updates, new_stars: newStars })
+            body: JSON.stringify({
+                name,
+                width: canvas.width,
+                height: canvas.height,
+                locked: isLocked,
+            })
         });
 
-        if (!response.ok) throw new Error('Failed to merge layout');
+        if (!response.ok) throw new Error('Failed to apply constellation');
         const data = await response.json();
-        const addedIds = data.created_ids || [];
 
         // Reload to reflect changes
         await loadGalaxy();
 
         showGalaxyToast(`${name} applied.`, 'success');
 
+        // Nothing moved or was added, so there is nothing to undo.
+        if (!data.op_id) return;
+
         // Show Undo Toast
         const toast = document.createElement('div');
         toast.className = 'toast toast-info show';
@@ -472,7 +493,7 @@ async function mergeConstellation(name, pattern, needed, isLocked) {
             <button class="btn-undo" style="margin-left: 10px; background: transparent; border: 1px solid white; color: white; padding: 2px 8px; border-radius: 4px; cursor: pointer;">Undo</button>
         `;
 
-        toast.querySelector('.btn-undo').onclick = () => undoMerge(previousState, addedIds, toast);
+        toast.querySelector('.btn-undo').onclick = () => undoMerge(data.op_id, toast);
 
         document.getElementById('toasts').appendChild(toast);
         setTimeout(() => {
@@ -488,36 +509,14 @@ async function mergeConstellation(name, pattern, needed, isLocked) {
     }
 }
 
-async function undoMerge(previousState, addedIds, toast) {
+async function undoMerge(opId, toast) {
     try {
-        // 1. Revert positions of updated stars
-        // We can just use the saveLayout endpoint with the previous state?
-        // Or just update local and save?
-        // Let's use the merge endpoint again to revert updates!
-
-        const updates = previousState.map(s => ({
-            id: s.id,
-            x: s.x,
-            y: s.y
-        }));
-
-        // 2. Delete added stars
-        if (addedIds.length > 0) {
-            await fetch('/api/galaxy/stars', {
-                method: 'DELETE',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ ids: addedIds })
-            });
-        }
-
-        // 3. Revert positions
-        if (updates.length > 0) {
-            await fetch('/api/galaxy/layout/merge', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ updates })
-            });
-        }
+        // The server kept the change-set; it restores only the touched
+        // stars and removes the ones the pattern added.
+        const response = await fetch(`/api/galaxy/undo/${encodeURIComponent(opId)}`, {
+            method: 'POST'
+        });
+        if (!response.ok) throw new Error('Failed to undo');
 
         await loadGalaxy();
         toast.remove();
@@ -659,8 +658,8 @@ async function saveLayout() {
         });
 
         if (!response.ok) throw new Error('Failed to save layout');
-        const data = await response.json();
-        lastSavedLayout = data.layout || payload.layout;
+        // The server only echoes moved stars; the payload is the full layout.
+        lastSavedLayout = payload.layout;
         markLayoutDirty(false);
         showGalaxyToast('Layout saved. Your constellation is secure!');
     } catch (error) {
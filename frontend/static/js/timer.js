@@ -149,6 +149,7 @@ async function onTimerCompleted() {
             body: JSON.stringify({
                 mood: currentMoodKey,
                 duration_minutes: durationMinutes,
+                tz: localTimeZone(),
             }),
         });
 
@@ -169,32 +170,33 @@ async function onTimerCompleted() {
 // ==================== MOODS & STATS ====================
 // Moods logic removed as requested
 
+function localTimeZone() {
+    try {
+        return Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC';
+    } catch (_) {
+        return 'UTC';
+    }
+}
+
 async function loadStats() {
     try {
-        const [summaryRes, streakRes] = await Promise.all([
-            fetch('/stats/summary'),
-            fetch('/stats/streak'),
-        ]);
-
-        if (summaryRes.ok) {
-            const summary = await summaryRes.json();
-            const statTasks = document.getElementById('statTasks');
-            const statFocus = document.getElementById('statFocus');
-            if (statTasks) {
-                statTasks.textContent = `${summary.completed_tasks} / ${summary.total_tasks} tasks completed`;
-            }
-            if (statFocus) {
-                statFocus.textContent = `${Math.round(summary.total_focus_minutes)} min focus`;
-            }
+        const response = await fetch(`/stats/dashboard?tz=${encodeURIComponent(localTimeZone())}`);
+        if (!response.ok) return;
+        const { summary, streak } = await response.json();
+
+        const statTasks = document.getElementById('statTasks');
+        const statFocus = document.getElementById('statFocus');
+        if (statTasks) {
+            statTasks.textContent = `${summary.completed_tasks} / ${summary.total_tasks} tasks completed`;
+        }
+        if (statFocus) {
+            statFocus.textContent = `${Math.round(summary.total_focus_minutes)} min focus`;
         }
 
-        if (streakRes.ok) {
-            const streak = await streakRes.json();
-            const statStreak = document.getElementById('statStreak');
-            if (statStreak) {
-                const days = streak.current_streak_days || 0;
-                statStreak.textContent = `${days} day${days === 1 ? '' : 's'} streak`;
-            }
+        const statStreak = document.getElementById('statStreak');
+        if (statStreak) {
+            const days = streak.current_streak_days || 0;
+            statStreak.textContent = `${days} day${days === 1 ? '' : 's'} streak`;
         }
     } catch (error) {
         console.error('Error loading stats:', error);